@@ -0,0 +1,281 @@
+"""
+Admission Module
+Global in-flight limit with a bounded priority wait queue, and per-client token-bucket rate limits
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+from metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUED, ADMISSION_REJECTIONS, ADMISSION_WAIT_SECONDS
+
+
+# Best first: an interactive request waiting for a slot always goes before a bulk one
+PRIORITIES = ['interactive', 'bulk']
+
+# Clients whose buckets are remembered; the least recently seen are forgotten first
+MAX_CLIENTS = 10000
+
+
+class AdmissionRejected(Exception):
+    """Request turned away; the client may retry after `retry_after` seconds"""
+
+    status_code = 503
+
+    def __init__(self, message, retry_after=1, reason=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class Overloaded(AdmissionRejected):
+    status_code = 503
+
+
+class RateLimited(AdmissionRejected):
+    status_code = 429
+
+
+def parse_rate_limits(value):
+    """Per-key limits from "key=per_minute[:burst],..." as {key: (per_minute, burst or None)}"""
+    limits = {}
+    for item in (value or '').split(','):
+        if not item.strip():
+            continue
+        key, _, limit = item.strip().partition('=')
+        per_minute, _, burst = limit.partition(':')
+        limits[key.strip()] = (float(per_minute), int(burst) if burst else None)
+    return limits
+
+
+class _Waiter:
+    __slots__ = ('rank', 'seq', 'priority', 'weight', 'bounded', 'future')
+
+    def __init__(self, rank, seq, priority, weight, bounded, future):
+        self.rank = rank
+        self.seq = seq
+        self.priority = priority
+        self.weight = weight
+        self.bounded = bounded
+        self.future = future
+
+    def __lt__(self, other):
+        return (self.rank, self.seq) < (other.rank, other.seq)
+
+
+class AdmissionController:
+    """
+    At most `max_in_flight` slots in use; later requests wait in priority order.
+
+    A request needs `weight` slots (a batch holds one per browser session).
+    At most `max_queued` requests wait at once: when the queue is full a new
+    request displaces the newest waiter of a lower priority, or is rejected
+    right away. Waiting longer than `queue_timeout` seconds is rejected too,
+    so under overload clients get a quick 503 instead of a slow timeout.
+    Unbounded waiters (background jobs) are neither counted nor displaced.
+    `max_in_flight=0` admits everything.
+    """
+
+    def __init__(self, max_in_flight=10, max_queued=50, queue_timeout=30, retry_after=5):
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.closed = False
+        self._waiters = []
+        self._seq = itertools.count()
+        self._stats = {'admitted': 0, 'queued': 0, 'rejected': 0, 'timed_out': 0, 'displaced': 0}
+
+    def _bounded_waiters(self):
+        return [waiter for waiter in self._waiters if waiter.bounded]
+
+    def _set_gauges(self):
+        ADMISSION_IN_FLIGHT.set(self.in_flight)
+        for priority in PRIORITIES:
+            ADMISSION_QUEUED.set(sum(1 for w in self._waiters if w.priority == priority), priority=priority)
+
+    def _grant(self, weight):
+        self.in_flight += weight
+        self._stats['admitted'] += 1
+
+    def _dispatch(self):
+        """Hand free slots to waiters, strictly in priority order"""
+        while self._waiters and self._waiters[0].future.done():
+            heapq.heappop(self._waiters)
+        while self._waiters and self.in_flight + self._waiters[0].weight <= self.max_in_flight:
+            waiter = heapq.heappop(self._waiters)
+            if waiter.future.done():
+                continue
+            self._grant(waiter.weight)
+            waiter.future.set_result(True)
+        self._set_gauges()
+
+    def _remove(self, waiter):
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+            heapq.heapify(self._waiters)
+
+    def _reject(self, reason, message):
+        self._stats['rejected'] += 1
+        ADMISSION_REJECTIONS.inc(reason=reason)
+        return Overloaded(message, self.retry_after, reason)
+
+    async def acquire(self, priority='interactive', weight=1, bounded=True):
+        """Wait for `weight` slots; returns the weight to pass to release()"""
+        if priority not in PRIORITIES:
+            raise ValueError(f"priority must be one of: {', '.join(PRIORITIES)}")
+        if self.closed:
+            raise self._reject('shutting_down', "Server shutting down")
+        if not self.max_in_flight:
+            self._grant(weight)
+            self._set_gauges()
+            return weight
+        weight = max(1, min(weight, self.max_in_flight))
+        if not self._waiters and self.in_flight + weight <= self.max_in_flight:
+            self._grant(weight)
+            self._set_gauges()
+            return weight
+
+        rank = PRIORITIES.index(priority)
+        if bounded:
+            queued = self._bounded_waiters()
+            if len(queued) >= self.max_queued:
+                victim = max(queued)
+                if victim.rank <= rank:
+                    raise self._reject('queue_full', f"Server busy: {len(queued)} requests already waiting")
+                self._remove(victim)
+                self._stats['displaced'] += 1
+                victim.future.set_exception(
+                    self._reject('displaced', "Server busy: displaced by a higher-priority request")
+                )
+
+        waiter = _Waiter(rank, next(self._seq), priority, weight, bounded,
+                         asyncio.get_running_loop().create_future())
+        heapq.heappush(self._waiters, waiter)
+        self._stats['queued'] += 1
+        # Slots may be free but held back for a heavier waiter this one outranks
+        self._dispatch()
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter.future, self.queue_timeout if bounded else None)
+        except asyncio.TimeoutError:
+            self._remove(waiter)
+            self._stats['timed_out'] += 1
+            self._dispatch()
+            raise self._reject('timeout', f"Server busy: no capacity within {self.queue_timeout}s")
+        except BaseException:
+            if waiter.future.done() and not waiter.future.cancelled() and waiter.future.exception() is None:
+                # Granted just as the caller went away: hand the slots back
+                self.release(weight)
+            else:
+                self._remove(waiter)
+                self._dispatch()
+            raise
+        finally:
+            ADMISSION_WAIT_SECONDS.observe(time.monotonic() - started, priority=priority)
+        return weight
+
+    def close(self):
+        """Turn away new and waiting requests (shutdown); admitted ones keep their slots"""
+        self.closed = True
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.future.done():
+                waiter.future.set_exception(self._reject('shutting_down', "Server shutting down"))
+        self._set_gauges()
+
+    def release(self, weight):
+        self.in_flight = max(0, self.in_flight - weight)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority='interactive', weight=1, bounded=True):
+        weight = await self.acquire(priority, weight, bounded)
+        try:
+            yield
+        finally:
+            self.release(weight)
+
+    def stats(self):
+        return {
+            'max_in_flight': self.max_in_flight,
+            'max_queued': self.max_queued,
+            'in_flight': self.in_flight,
+            'waiting': {p: sum(1 for w in self._waiters if w.priority == p) for p in PRIORITIES},
+            **self._stats,
+        }
+
+
+class TokenBucket:
+    """`burst` tokens, refilled at `per_minute` tokens per minute"""
+
+    def __init__(self, per_minute, burst):
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self, cost=1):
+        """Take `cost` tokens; returns 0 on success, else seconds until they are available"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        cost = min(cost, self.burst)
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0
+        return (cost - self.tokens) / self.rate if self.rate else float('inf')
+
+
+class RateLimiter:
+    """
+    One token bucket per client (API key, or address without one).
+
+    `per_minute=0` leaves clients without a `key_limits` entry unlimited.
+    A request costs one token per search, capped at the bucket size.
+    """
+
+    def __init__(self, per_minute=0, burst=10, key_limits=None, max_clients=MAX_CLIENTS):
+        self.per_minute = per_minute
+        self.burst = burst
+        self.key_limits = key_limits or {}
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._stats = {'allowed': 0, 'limited': 0}
+
+    def _limit(self, key):
+        per_minute, burst = self.key_limits.get(key, (self.per_minute, None))
+        return per_minute, burst or self.burst
+
+    def check(self, key, cost=1):
+        """Charge `cost` to `key`'s bucket, or raise RateLimited"""
+        per_minute, burst = self._limit(key)
+        if per_minute <= 0:
+            return
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(per_minute, burst)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        self._buckets.move_to_end(key)
+
+        wait = bucket.take(cost)
+        if wait:
+            self._stats['limited'] += 1
+            ADMISSION_REJECTIONS.inc(reason='rate_limited')
+            raise RateLimited(f"Rate limit exceeded: {per_minute:g} searches per minute",
+                              retry_after=wait, reason='rate_limited')
+        self._stats['allowed'] += 1
+
+    def stats(self):
+        return {
+            'per_minute': self.per_minute,
+            'burst': self.burst,
+            'keys_with_own_limit': len(self.key_limits),
+            'clients': len(self._buckets),
+            **self._stats,
+        }
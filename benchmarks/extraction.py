@@ -0,0 +1,177 @@
+"""
+Extraction Benchmark
+Quality and speed of main-content extraction on the HTML fixtures in fixtures/extraction
+
+Each fixture is a page (<name>.html) with its hand-picked article text and
+boilerplate snippets (<name>.json). Quality is word-level precision, recall
+and F1 of main_text against the article text, plus how many boilerplate
+snippets leaked into it; speed is the median extraction time.
+
+    python -m benchmarks.extraction                     # scoring vs. selector list, on HTML
+    python -m benchmarks.extraction --browser           # also in-page, in a local Chromium
+    python -m benchmarks.extraction --browser --cdp ws://...   # in-page, in a remote browser
+    python -m benchmarks.extraction --min-f1 0.9        # exit 1 if any fixture scores lower
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import statistics
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from content_extractor import EXTRACTION_CONFIG, extract_from_html, extract_from_page  # noqa: E402
+
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures' / 'extraction'
+
+STRATEGIES = {
+    'scoring': EXTRACTION_CONFIG,
+    'selectors': {**EXTRACTION_CONFIG, 'scoring': False},
+}
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def load_fixtures(names=None):
+    fixtures = []
+    for path in sorted(FIXTURES_DIR.glob('*.html')):
+        if names and path.stem not in names:
+            continue
+        expected = json.loads(path.with_suffix('.json').read_text(encoding='utf-8'))
+        fixtures.append({'name': path.stem, 'html': path.read_text(encoding='utf-8'), **expected})
+    return fixtures
+
+
+def score(fixture, main_text):
+    """Word-level precision/recall/F1 against the fixture's article text"""
+    found = Counter(word.lower() for word in WORD_PATTERN.findall(main_text))
+    wanted = Counter(word.lower() for word in WORD_PATTERN.findall(fixture['main_text']))
+    common = sum((found & wanted).values())
+    precision = common / sum(found.values()) if found else 0.0
+    recall = common / sum(wanted.values()) if wanted else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    leaked = [snippet for snippet in fixture.get('boilerplate', []) if snippet in main_text]
+    return {
+        'precision': round(precision, 3),
+        'recall': round(recall, 3),
+        'f1': round(f1, 3),
+        'boilerplate': len(leaked),
+        'chars': len(main_text),
+    }
+
+
+def run_html(fixture, config, iterations):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        data = extract_from_html(fixture['html'], fixture['url'], config)
+        timings.append((time.perf_counter() - started) * 1000)
+    return data, statistics.median(timings)
+
+
+async def run_browser(fixtures, iterations, cdp_url=None):
+    """In-page results per (fixture, strategy), using EXTRACTION_SCRIPT in Chromium"""
+    from playwright.async_api import async_playwright
+
+    results = []
+    async with async_playwright() as p:
+        if cdp_url:
+            browser = await p.chromium.connect_over_cdp(cdp_url)
+        else:
+            browser = await p.chromium.launch()
+        try:
+            context = await browser.new_context(java_script_enabled=True)
+            page = await context.new_page()
+            # Fixtures reference nothing external; keep stray requests off the network
+            await page.route('**/*', lambda route: route.abort()
+                             if route.request.resource_type != 'document' else route.continue_())
+            for fixture in fixtures:
+                await page.set_content(fixture['html'], wait_until='domcontentloaded')
+                for strategy, config in STRATEGIES.items():
+                    timings = []
+                    for _ in range(iterations):
+                        started = time.perf_counter()
+                        data = await extract_from_page(page, config)
+                        timings.append((time.perf_counter() - started) * 1000)
+                    results.append(row(fixture, 'browser', strategy, data, statistics.median(timings)))
+            await context.close()
+        finally:
+            await browser.close()
+    return results
+
+
+def row(fixture, runner, strategy, data, ms):
+    return {
+        'fixture': fixture['name'],
+        'runner': runner,
+        'strategy': strategy,
+        'container': data['container'],
+        **score(fixture, data['main_text']),
+        'ms': round(ms, 2),
+    }
+
+
+def print_table(rows):
+    columns = ['fixture', 'runner', 'strategy', 'container', 'precision', 'recall', 'f1',
+               'boilerplate', 'chars', 'ms']
+    widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) for c in columns}
+    print('  '.join(c.ljust(widths[c]) for c in columns))
+    for r in rows:
+        print('  '.join(str(r[c]).ljust(widths[c]) for c in columns))
+
+    print()
+    for runner in dict.fromkeys(r['runner'] for r in rows):
+        for strategy in STRATEGIES:
+            group = [r for r in rows if r['runner'] == runner and r['strategy'] == strategy]
+            if not group:
+                continue
+            print(
+                f"{runner:8} {strategy:10} mean F1 {statistics.mean(r['f1'] for r in group):.3f}  "
+                f"boilerplate {sum(r['boilerplate'] for r in group):3d}  "
+                f"chars {sum(r['chars'] for r in group):6d}  "
+                f"total {sum(r['ms'] for r in group):.2f} ms"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('fixtures', nargs='*', help='Fixture names to run (default: all)')
+    parser.add_argument('--iterations', type=int, default=20, help='Timed runs per fixture (median is reported)')
+    parser.add_argument('--browser', action='store_true', help='Also run the in-page script in Chromium')
+    parser.add_argument('--cdp', help='CDP WebSocket URL of a running browser, e.g. a Steel session')
+    parser.add_argument('--json', action='store_true', help='Print rows as JSON')
+    parser.add_argument('--min-f1', type=float, help='Fail if the scoring strategy scores lower on any fixture')
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(set(args.fixtures))
+    if not fixtures:
+        parser.error(f'no fixtures found in {FIXTURES_DIR}')
+
+    rows = []
+    for fixture in fixtures:
+        for strategy, config in STRATEGIES.items():
+            data, ms = run_html(fixture, config, args.iterations)
+            rows.append(row(fixture, 'html', strategy, data, ms))
+    if args.browser or args.cdp:
+        rows.extend(asyncio.run(run_browser(fixtures, args.iterations, args.cdp)))
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(rows)
+
+    if args.min_f1 is not None:
+        failed = [r for r in rows if r['strategy'] == 'scoring' and r['f1'] < args.min_f1]
+        for r in failed:
+            print(f"{r['fixture']} ({r['runner']}): F1 {r['f1']} < {args.min_f1}", file=sys.stderr)
+        sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
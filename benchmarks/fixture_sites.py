@@ -0,0 +1,179 @@
+"""
+Fixture Sites
+Local fake Google SERP plus a corpus of article pages, with configurable latency
+
+/search answers like Google's result page as far as the scraper looks at it
+(#search/#rso, titles in <a><h3>, div[role="heading"] for tbm=nws, paging
+with &start=): ten deterministic results per page for a given query, for up
+to --max-pages pages. Results link to /article/<n> on 127.0.0.1 and
+localhost alternately, so per-host limits see two sites. Articles are the
+extraction fixtures; with --js-ratio a share of them is served as a
+JavaScript shell that only renders in a browser.
+
+    python -m benchmarks.fixture_sites --port 8100 --latency-ms 150 --jitter-ms 100
+    GOOGLE_SEARCH_URL=http://127.0.0.1:8100/search uvicorn main:app
+"""
+
+import argparse
+import asyncio
+import html
+import json
+import random
+import zlib
+from pathlib import Path
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import HTMLResponse
+
+
+CORPUS_DIR = Path(__file__).resolve().parent / 'fixtures' / 'extraction'
+
+RESULTS_PER_PAGE = 10
+
+# Distinct article URLs; a query's results are a window into this range
+ARTICLE_COUNT = 10000
+
+RESULT_HOSTS = ['127.0.0.1', 'localhost']
+
+SERP_TEMPLATE = """<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>{query} - Fixture Search</title></head>
+<body>
+<div id="search"><div id="rso">
+{results}
+</div></div>
+</body></html>
+"""
+
+RESULT_TEMPLATES = {
+    'web': '<div class="g"><a href="{url}"><h3>{title}</h3></a><div class="VwiC3b">{snippet}</div></div>',
+    'news': '<div class="SoaBEf"><a href="{url}"><div role="heading">{title}</div></a>'
+            '<div class="GI74Re">{snippet}</div></div>',
+}
+
+# Served instead of the article for --js-ratio of URLs: no text until a script runs
+JS_SHELL_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Loading...</title></head>
+<body>
+<noscript>Please enable JavaScript to read this article.</noscript>
+<div id="app"></div>
+<script>
+document.open();
+document.write({html});
+document.close();
+</script>
+</body></html>
+"""
+
+
+def load_corpus(corpus_dir=CORPUS_DIR):
+    """(title, html) of every .html page in `corpus_dir`, sorted by name"""
+    pages = []
+    for path in sorted(Path(corpus_dir).glob('*.html')):
+        pages.append((path.stem.replace('_', ' ').title(), path.read_text(encoding='utf-8')))
+    if not pages:
+        raise ValueError(f"No .html pages in {corpus_dir}")
+    return pages
+
+
+class FixtureSites:
+    def __init__(self, corpus, latency=0, jitter=0, serp_latency=0, js_ratio=0, max_pages=6):
+        self.corpus = corpus
+        self.latency = latency
+        self.jitter = jitter
+        self.serp_latency = serp_latency
+        self.js_ratio = js_ratio
+        self.max_pages = max_pages
+        self._stats = {'serp_pages': 0, 'articles': 0, 'js_shells': 0}
+
+    def article_number(self, query, index):
+        """Article behind the `index`-th result of `query`; same query, same results"""
+        return (zlib.crc32(query.encode('utf-8')) + index) % ARTICLE_COUNT
+
+    def is_js_shell(self, number):
+        return random.Random(number).random() < self.js_ratio
+
+    def serp(self, query, start, port, search_type='web'):
+        results = []
+        if start < self.max_pages * RESULTS_PER_PAGE:
+            template = RESULT_TEMPLATES[search_type]
+            for index in range(start, start + RESULTS_PER_PAGE):
+                number = self.article_number(query, index)
+                title, _ = self.corpus[number % len(self.corpus)]
+                host = RESULT_HOSTS[index % len(RESULT_HOSTS)]
+                results.append(template.format(
+                    url=f"http://{host}{f':{port}' if port else ''}/article/{number}",
+                    title=html.escape(f"{title} #{number} - {query}"),
+                    snippet=html.escape(f"Result {index + 1} for {query}"),
+                ))
+        self._stats['serp_pages'] += 1
+        return SERP_TEMPLATE.format(query=html.escape(query), results='\n'.join(results))
+
+    def article(self, number):
+        _, page = self.corpus[number % len(self.corpus)]
+        self._stats['articles'] += 1
+        if self.is_js_shell(number):
+            self._stats['js_shells'] += 1
+            # Escaped so the page's own </script> tags don't end the shell's script
+            return JS_SHELL_TEMPLATE.format(html=json.dumps(page).replace('</', '<\\/'))
+        return page
+
+    async def delay(self, base):
+        seconds = base + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+
+    def stats(self):
+        return dict(self._stats)
+
+
+def create_app(sites):
+    app = FastAPI(title="Fixture Sites", description=__doc__.split('\n')[2])
+
+    @app.get("/search", response_class=HTMLResponse)
+    async def search(request: Request, q: str = '', start: int = 0, tbm: str = None):
+        await sites.delay(sites.serp_latency)
+        search_type = 'news' if tbm == 'nws' else 'web'
+        return HTMLResponse(sites.serp(q, start, request.url.port, search_type))
+
+    @app.get("/article/{number}", response_class=HTMLResponse)
+    async def article(number: int):
+        if not 0 <= number < ARTICLE_COUNT:
+            raise HTTPException(status_code=404, detail="No such article")
+        await sites.delay(sites.latency)
+        return HTMLResponse(sites.article(number))
+
+    @app.get("/stats")
+    async def stats():
+        return sites.stats()
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--corpus', default=str(CORPUS_DIR), help='Directory of .html article pages')
+    parser.add_argument('--latency-ms', type=int, default=100, help='Base latency of an article page')
+    parser.add_argument('--jitter-ms', type=int, default=50, help='Random extra latency, 0 to this')
+    parser.add_argument('--serp-latency-ms', type=int, default=200, help='Latency of a search page')
+    parser.add_argument('--js-ratio', type=float, default=0.0,
+                        help='Share of articles served as a JavaScript-only shell (0-1)')
+    parser.add_argument('--max-pages', type=int, default=6, help='Search pages that have results')
+    args = parser.parse_args()
+
+    sites = FixtureSites(
+        load_corpus(args.corpus),
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        serp_latency=args.serp_latency_ms / 1000,
+        js_ratio=args.js_ratio,
+        max_pages=args.max_pages,
+    )
+    uvicorn.run(create_app(sites), host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,324 @@
+"""
+Load Benchmark
+Concurrent /search load against the API, reporting latency percentiles, throughput and memory
+
+Without --spawn it targets a running API (--url). With --spawn it first
+starts, on free local ports, the fixture sites (fake SERP and articles),
+the mock Steel (one local Chromium per session) and the API itself wired
+to both, so the whole run needs no network:
+
+    python -m benchmarks.load --spawn --concurrency 4 --requests 40
+    python -m benchmarks.load --spawn --duration 60 --latency-ms 300 --js-ratio 0.2
+    python -m benchmarks.load --url http://127.0.0.1:8000 --concurrency 8 --json
+
+Every request uses a distinct query and cache=bypass by default, so runs
+measure scraping rather than the result cache. Memory is the API's
+process_resident_memory_bytes, sampled from /metrics during the run.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import httpx
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Interval between memory samples taken from /metrics
+MEMORY_SAMPLE_INTERVAL = 0.5
+
+# How long spawned servers may take to answer
+READY_TIMEOUT = 60
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, p):
+    """p-th percentile (0-100) of `values`, interpolated like numpy's default"""
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[p - 1]
+
+
+async def resident_memory(http, url):
+    """process_resident_memory_bytes from the API's /metrics, or None"""
+    try:
+        response = await http.get(f"{url}/metrics", timeout=5)
+    except httpx.HTTPError:
+        return None
+    for line in response.text.splitlines():
+        if line.startswith('process_resident_memory_bytes '):
+            return float(line.split()[1])
+    return None
+
+
+async def sample_memory(http, url, samples, stop):
+    while not stop.is_set():
+        value = await resident_memory(http, url)
+        if value is not None:
+            samples.append(value)
+        try:
+            await asyncio.wait_for(stop.wait(), MEMORY_SAMPLE_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+class LoadRun:
+    def __init__(self, url, payload, concurrency, requests=None, duration=None, timeout=300):
+        self.url = url
+        self.payload = payload
+        self.concurrency = concurrency
+        self.requests = requests
+        self.duration = duration
+        self.timeout = timeout
+        self.issued = 0
+        self.results = []
+
+    def _next(self):
+        """Index of the next request to send, or None when the run is over"""
+        if self.requests is not None and self.issued >= self.requests:
+            return None
+        if self.duration is not None and time.monotonic() - self.started >= self.duration:
+            return None
+        self.issued += 1
+        return self.issued
+
+    async def _worker(self, http, prefix):
+        while (index := self._next()) is not None:
+            payload = {**self.payload, 'query': f"{self.payload['query']} {prefix}{index}"}
+            started = time.monotonic()
+            result = {'status': None, 'results': 0, 'stages': {}}
+            try:
+                response = await http.post(f"{self.url}/search", json=payload, timeout=self.timeout)
+                result['status'] = response.status_code
+                if response.status_code == 200:
+                    data = response.json()
+                    result['results'] = len(data.get('results') or [])
+                    result['stages'] = (data.get('timings') or {}).get('stages', {})
+            except httpx.HTTPError as e:
+                result['status'] = type(e).__name__
+            result['seconds'] = time.monotonic() - started
+            self.results.append(result)
+
+    async def run(self, http, prefix=''):
+        self.started = time.monotonic()
+        await asyncio.gather(*(self._worker(http, prefix) for _ in range(self.concurrency)))
+        self.elapsed = time.monotonic() - self.started
+        return self
+
+
+def report(run, memory):
+    ok = [r for r in run.results if r['status'] == 200]
+    latencies = sorted(r['seconds'] * 1000 for r in ok)
+    stages = {}
+    for r in ok:
+        for name, stage in r['stages'].items():
+            stages.setdefault(name, []).append(stage['total_ms'])
+
+    summary = {
+        'requests': len(run.results),
+        'ok': len(ok),
+        'errors': dict(Counter(str(r['status']) for r in run.results if r['status'] != 200)),
+        'concurrency': run.concurrency,
+        'elapsed_s': round(run.elapsed, 2),
+        'throughput_rps': round(len(ok) / run.elapsed, 3) if run.elapsed else 0,
+        'results_per_request': round(statistics.mean(r['results'] for r in ok), 2) if ok else 0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50)),
+            'p95': round(percentile(latencies, 95)),
+            'p99': round(percentile(latencies, 99)),
+            'max': round(latencies[-1]),
+            'mean': round(statistics.mean(latencies)),
+        } if latencies else None,
+        # Mean time per request spent in each tracing stage (summed over its spans)
+        'stages_ms': {name: round(statistics.mean(values), 1) for name, values in sorted(stages.items())},
+        'memory_mb': {
+            'start': round(memory[0] / 2**20, 1),
+            'peak': round(max(memory) / 2**20, 1),
+            'end': round(memory[-1] / 2**20, 1),
+        } if memory else None,
+    }
+    return summary
+
+
+def print_report(summary):
+    print(f"requests     {summary['requests']} ({summary['ok']} ok) at concurrency {summary['concurrency']}"
+          f" in {summary['elapsed_s']}s")
+    if summary['errors']:
+        print(f"errors       {', '.join(f'{k}: {v}' for k, v in summary['errors'].items())}")
+    print(f"throughput   {summary['throughput_rps']} req/s, {summary['results_per_request']} results/req")
+    if summary['latency_ms']:
+        print('latency      ' + '  '.join(f"{k} {v} ms" for k, v in summary['latency_ms'].items()))
+    if summary['memory_mb']:
+        print('memory       ' + '  '.join(f"{k} {v} MB" for k, v in summary['memory_mb'].items()))
+    if summary['stages_ms']:
+        print('stages (mean ms per request)')
+        width = max(len(name) for name in summary['stages_ms'])
+        for name, ms in summary['stages_ms'].items():
+            print(f"  {name.ljust(width)}  {ms}")
+
+
+class Servers:
+    """Fixture sites, mock Steel and the API as local subprocesses on free ports"""
+
+    def __init__(self, args):
+        self.args = args
+        self.processes = []
+
+    def _start(self, name, command, env=None):
+        log = open(Path(self.args.log_dir) / f"{name}.log", 'w') if self.args.log_dir else subprocess.DEVNULL
+        process = subprocess.Popen(command, cwd=ROOT, env={**os.environ, **(env or {})},
+                                   stdout=log, stderr=subprocess.STDOUT)
+        self.processes.append((name, process))
+        return process
+
+    async def _wait_ready(self, http, name, url):
+        deadline = time.monotonic() + READY_TIMEOUT
+        while time.monotonic() < deadline:
+            for process_name, process in self.processes:
+                if process.poll() is not None:
+                    raise RuntimeError(f"{process_name} exited with {process.returncode}")
+            try:
+                await http.get(url, timeout=2)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+        raise RuntimeError(f"{name} not ready at {url} after {READY_TIMEOUT}s")
+
+    async def start(self, http):
+        args = self.args
+        python = sys.executable
+        sites_url = f"http://127.0.0.1:{free_port()}"
+        steel_url = args.steel_url or f"http://127.0.0.1:{free_port()}"
+        api_port = free_port()
+
+        self._start('fixture_sites', [
+            python, '-m', 'benchmarks.fixture_sites', '--port', sites_url.rsplit(':', 1)[1],
+            '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms),
+            '--serp-latency-ms', str(args.serp_latency_ms), '--js-ratio', str(args.js_ratio),
+        ])
+        if not args.steel_url:
+            command = [python, '-m', 'benchmarks.mock_steel', '--port', steel_url.rsplit(':', 1)[1]]
+            if args.chromium:
+                command += ['--chromium', args.chromium]
+            self._start('mock_steel', command)
+        self._start('api', [
+            python, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1', '--port', str(api_port),
+            '--log-level', 'warning',
+        ], env={
+            'STEEL_URL': steel_url,
+            'STEEL_URLS': steel_url,
+            'GOOGLE_SEARCH_URL': f"{sites_url}/search",
+            'JOBS_DB_PATH': '',
+            'LOG_LEVEL': os.getenv('LOG_LEVEL', 'WARNING'),
+        })
+
+        await self._wait_ready(http, 'fixture sites', f"{sites_url}/stats")
+        await self._wait_ready(http, 'Steel', f"{steel_url}/v1/sessions")
+        api_url = f"http://127.0.0.1:{api_port}"
+        await self._wait_ready(http, 'API', f"{api_url}/metrics")
+        return api_url
+
+    def stop(self):
+        for _, process in reversed(self.processes):
+            if process.poll() is None:
+                process.terminate()
+        for _, process in reversed(self.processes):
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+async def benchmark(args):
+    payload = {
+        'query': args.query,
+        'search_type': args.search_type,
+        'num_results': args.num_results,
+        'concurrency': args.page_concurrency,
+        'fetch_mode': args.fetch_mode,
+        'cache': args.cache,
+        'wait_until': args.wait_until,
+    }
+    limits = httpx.Limits(max_connections=args.concurrency + 2, max_keepalive_connections=args.concurrency + 2)
+    async with httpx.AsyncClient(limits=limits) as http:
+        servers = Servers(args) if args.spawn else None
+        try:
+            url = await servers.start(http) if servers else args.url.rstrip('/')
+            # Start every run from a distinct query range so earlier runs can't be cached
+            prefix = f"{int(time.time())}-"
+            if args.warmup:
+                await LoadRun(url, payload, args.concurrency, requests=args.warmup,
+                              timeout=args.timeout).run(http, prefix + 'warmup-')
+
+            memory, stop = [], asyncio.Event()
+            sampler = asyncio.create_task(sample_memory(http, url, memory, stop))
+            run = await LoadRun(url, payload, args.concurrency, args.requests, args.duration,
+                                args.timeout).run(http, prefix)
+            stop.set()
+            await sampler
+            if (value := await resident_memory(http, url)) is not None:
+                memory.append(value)
+            return report(run, memory)
+        finally:
+            if servers:
+                servers.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='API to load (ignored with --spawn)')
+    parser.add_argument('--spawn', action='store_true',
+                        help='Start fixture sites, mock Steel and the API locally for the run')
+    parser.add_argument('--concurrency', type=int, default=4, help='Requests in flight at once')
+    parser.add_argument('--requests', type=int, help='Requests to send (default: 20 unless --duration)')
+    parser.add_argument('--duration', type=float, help='Seconds to keep sending requests')
+    parser.add_argument('--warmup', type=int, default=2, help='Unmeasured requests sent first')
+    parser.add_argument('--timeout', type=float, default=300, help='Client timeout per request, seconds')
+    parser.add_argument('--json', action='store_true', help='Print the summary as JSON')
+
+    search = parser.add_argument_group('search request')
+    search.add_argument('--query', default='benchmark query')
+    search.add_argument('--search-type', default='web', choices=['web', 'news'])
+    search.add_argument('--num-results', type=int, default=5)
+    search.add_argument('--page-concurrency', type=int, default=4, help='concurrency field of each search')
+    search.add_argument('--fetch-mode', default='auto', choices=['auto', 'browser', 'http'])
+    search.add_argument('--cache', default='bypass', choices=['prefer', 'bypass', 'only'])
+    search.add_argument('--wait-until', default='stable')
+
+    spawn = parser.add_argument_group('spawned servers (--spawn)')
+    spawn.add_argument('--steel-url', help='Use this Steel instead of starting the mock')
+    spawn.add_argument('--chromium', help='Chromium executable for the mock Steel')
+    spawn.add_argument('--latency-ms', type=int, default=100, help='Article page latency')
+    spawn.add_argument('--jitter-ms', type=int, default=50, help='Random extra article latency')
+    spawn.add_argument('--serp-latency-ms', type=int, default=200, help='Search page latency')
+    spawn.add_argument('--js-ratio', type=float, default=0.0, help='Share of JavaScript-only articles')
+    spawn.add_argument('--log-dir', help='Write each server\'s output to <name>.log here')
+    args = parser.parse_args()
+
+    if args.requests is None and args.duration is None:
+        args.requests = 20
+
+    summary = asyncio.run(benchmark(args))
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_report(summary)
+    sys.exit(0 if summary['ok'] else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+"""
+Mock Steel
+Local stand-in for Steel's /v1/sessions API, one local Chromium per session over CDP
+
+Each session is a fresh Chromium process with remote debugging on a free
+port and a throwaway profile; its browser WebSocket URL is returned as
+websocketUrl, exactly where a Steel deployment would put it. Releasing the
+session kills the process. No network is needed.
+
+    python -m benchmarks.mock_steel --port 3100
+    python -m benchmarks.mock_steel --port 3100 --max-sessions 4 --create-delay-ms 300
+    STEEL_URL=http://127.0.0.1:3100 uvicorn main:app
+"""
+
+import argparse
+import asyncio
+import logging
+import shutil
+import tempfile
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+
+from fastapi import FastAPI, HTTPException
+
+
+logger = logging.getLogger(__name__)
+
+
+CHROMIUM_ARGS = [
+    '--remote-debugging-port=0',
+    '--remote-debugging-address=127.0.0.1',
+    '--no-first-run',
+    '--no-default-browser-check',
+    '--disable-background-networking',
+    '--disable-component-update',
+    '--disable-sync',
+    '--mute-audio',
+    '--no-sandbox',
+]
+
+# How long a new Chromium may take to write its DevToolsActivePort file
+STARTUP_TIMEOUT = 30
+
+
+async def chromium_executable():
+    """Path of the Chromium build Playwright installed (`playwright install chromium`)"""
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as p:
+        path = p.chromium.executable_path
+    if not Path(path).exists():
+        raise RuntimeError(f"Chromium not found at {path}: run `playwright install chromium` or pass --chromium")
+    return path
+
+
+class BrowserSession:
+    """A Chromium process with remote debugging enabled"""
+
+    def __init__(self, session_id, process, profile_dir, websocket_url):
+        self.id = session_id
+        self.process = process
+        self.profile_dir = profile_dir
+        self.websocket_url = websocket_url
+        self.created_at = datetime.now()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': 'live' if self.process.returncode is None else 'released',
+            'websocketUrl': self.websocket_url,
+            'createdAt': self.created_at.isoformat(),
+        }
+
+    async def close(self):
+        if self.process.returncode is None:
+            self.process.terminate()
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                self.process.kill()
+                await self.process.wait()
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+
+class MockSteel:
+    def __init__(self, executable=None, headless=True, max_sessions=0, create_delay=0):
+        self.executable = executable
+        self.headless = headless
+        self.max_sessions = max_sessions
+        self.create_delay = create_delay
+        self.sessions = {}
+        self.starting = 0
+        self._stats = {'created': 0, 'released': 0, 'rejected': 0}
+
+    async def create(self):
+        if self.max_sessions and len(self.sessions) + self.starting >= self.max_sessions:
+            self._stats['rejected'] += 1
+            raise HTTPException(status_code=429, detail=f"At most {self.max_sessions} sessions")
+        self.starting += 1
+        try:
+            session = await self._start()
+        finally:
+            self.starting -= 1
+        self.sessions[session.id] = session
+        self._stats['created'] += 1
+        logger.info("Session %s started (pid %s)", session.id, session.process.pid)
+        return session
+
+    async def _start(self):
+        if self.executable is None:
+            self.executable = await chromium_executable()
+        if self.create_delay:
+            await asyncio.sleep(self.create_delay)
+
+        profile_dir = tempfile.mkdtemp(prefix='mock-steel-')
+        args = [*CHROMIUM_ARGS, f'--user-data-dir={profile_dir}']
+        if self.headless:
+            args.append('--headless=new')
+        process = await asyncio.create_subprocess_exec(
+            self.executable, *args, 'about:blank',
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL,
+        )
+        try:
+            websocket_url = await self._websocket_url(process, Path(profile_dir))
+        except Exception:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            shutil.rmtree(profile_dir, ignore_errors=True)
+            raise
+
+        return BrowserSession(str(uuid.uuid4()), process, profile_dir, websocket_url)
+
+    async def _websocket_url(self, process, profile_dir):
+        """Chromium writes its port and browser target path to DevToolsActivePort once listening"""
+        port_file = profile_dir / 'DevToolsActivePort'
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if process.returncode is not None:
+                raise HTTPException(status_code=500, detail=f"Chromium exited with {process.returncode}")
+            lines = port_file.read_text().split('\n') if port_file.exists() else []
+            if len(lines) >= 2 and lines[1]:
+                return f"ws://127.0.0.1:{lines[0].strip()}{lines[1].strip()}"
+            await asyncio.sleep(0.05)
+        raise HTTPException(status_code=504, detail="Chromium did not open its debugging port in time")
+
+    async def release(self, session_id):
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+        await session.close()
+        self._stats['released'] += 1
+        logger.info("Session %s released", session_id)
+        return session
+
+    async def close(self):
+        await asyncio.gather(*(session.close() for session in self.sessions.values()))
+        self.sessions.clear()
+
+    def stats(self):
+        return {'live': len(self.sessions), 'starting': self.starting, **self._stats}
+
+
+def create_app(steel):
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        yield
+        await steel.close()
+
+    app = FastAPI(title="Mock Steel", description=__doc__.split('\n')[2], lifespan=lifespan)
+
+    @app.post("/v1/sessions")
+    async def create_session(options: dict = None):
+        session = await steel.create()
+        return session.to_dict()
+
+    @app.post("/v1/sessions/{session_id}/release")
+    async def release_session(session_id: str):
+        session = await steel.release(session_id)
+        return {**session.to_dict(), 'success': True}
+
+    @app.get("/v1/sessions")
+    async def list_sessions():
+        return {'sessions': [session.to_dict() for session in steel.sessions.values()]}
+
+    @app.get("/stats")
+    async def stats():
+        return steel.stats()
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3100)
+    parser.add_argument('--chromium', help='Chromium executable (default: the one Playwright installed)')
+    parser.add_argument('--headful', action='store_true', help='Show browser windows')
+    parser.add_argument('--max-sessions', type=int, default=0,
+                        help='Answer 429 beyond this many live sessions (0: no limit)')
+    parser.add_argument('--create-delay-ms', type=int, default=0,
+                        help='Extra delay per session creation, to mimic a remote Steel')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    # Resolved up front so a missing Chromium fails here, not on the first session
+    executable = args.chromium or asyncio.run(chromium_executable())
+    steel = MockSteel(executable, not args.headful, args.max_sessions, args.create_delay_ms / 1000)
+    uvicorn.run(create_app(steel), host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
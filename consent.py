@@ -0,0 +1,209 @@
+"""
+Consent Module
+Cookie-banner dismissal with one in-page query and per-domain memory
+"""
+
+import logging
+import time
+import weakref
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+
+logger = logging.getLogger(__name__)
+
+# Accept buttons of common consent platforms (Google, OneTrust, Didomi,
+# iubenda, Cookiebot, Funding Choices, Quantcast, TrustArc, Osano)
+CONSENT_SELECTORS = [
+    '#L2AGLb',
+    '#onetrust-accept-btn-handler',
+    '#didomi-notice-agree-button',
+    '.iubenda-cs-accept-btn',
+    '#CybotCookiebotDialogBodyLevelButtonLevelOptinAllowAll',
+    '#CybotCookiebotDialogBodyButtonAccept',
+    'button.fc-cta-consent',
+    '.qc-cmp2-summary-buttons button[mode="primary"]',
+    '#truste-consent-button',
+    '.osano-cm-accept-all',
+]
+
+# Accept-button labels per language, matched on the whole (case-insensitive) button text
+CONSENT_LABELS = {
+    'it': ['Accetta tutto', 'Accetta', 'Accetto', 'Accetta tutti', 'Accetta tutti i cookie', 'Acconsento'],
+    'en': ['Accept all', 'Accept', 'Accept all cookies', 'Accept cookies', 'I agree', 'Agree', 'Allow all'],
+    'nl': ['Alles accepteren', 'Accepteren', 'Akkoord', 'Alle cookies accepteren'],
+    'de': ['Alle akzeptieren', 'Akzeptieren', 'Zustimmen', 'Alle Cookies akzeptieren', 'Einverstanden'],
+    'fr': ['Tout accepter', 'Accepter', "J'accepte", 'Accepter et fermer', 'Accepter tout'],
+    'es': ['Aceptar todo', 'Aceptar', 'Acepto', 'Aceptar todas', 'Aceptar cookies'],
+    'pt': ['Aceitar tudo', 'Aceitar', 'Concordo', 'Aceitar todos'],
+}
+
+# Frames worth searching besides the main document (consent platforms in iframes)
+CONSENT_FRAME_HINTS = ['consent', 'cmp', 'privacy', 'sourcepoint', 'cookie']
+
+# How long to wait for a banner on domains not yet known to be banner-free;
+# result pages get less since they were already waited on for readiness
+CONSENT_SERP_WAIT_MS = 1500
+CONSENT_PAGE_WAIT_MS = 250
+CONSENT_POLL_MS = 100
+
+# Finds a visible accept button (selectors first, then labels), clicks it;
+# polls until waitMs so late-loading banners are still caught
+CONSENT_SCRIPT = """
+({selector, labels, waitMs, pollMs}) => new Promise((resolve) => {
+    const start = performance.now();
+    const wanted = new Set(labels);
+    const visible = (el) => {
+        const rect = el.getBoundingClientRect();
+        return rect.width > 0 && rect.height > 0;
+    };
+    const find = () => {
+        const bySelector = Array.from(document.querySelectorAll(selector)).find(visible);
+        if (bySelector) {
+            return {el: bySelector, via: bySelector.id || bySelector.tagName.toLowerCase()};
+        }
+        const candidates = document.querySelectorAll(
+            'button, [role="button"], input[type="submit"], input[type="button"]'
+        );
+        for (const el of candidates) {
+            const label = (el.innerText || el.value || '').trim().toLowerCase();
+            if (label && label.length <= 40 && wanted.has(label) && visible(el)) {
+                return {el: el, via: label};
+            }
+        }
+        return null;
+    };
+    const tick = () => {
+        const match = find();
+        if (match) {
+            match.el.click();
+            return resolve({clicked: true, via: match.via});
+        }
+        if (performance.now() - start >= waitMs) {
+            return resolve({clicked: false, via: null});
+        }
+        setTimeout(tick, pollMs);
+    };
+    tick();
+})
+"""
+
+
+def consent_domain(url):
+    host = (urlparse(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+class ConsentHandler:
+    """
+    Dismisses cookie banners and remembers, per domain, whether one was seen.
+
+    Domains known to have no banner are checked without waiting. Consent
+    cookies set by an accepted banner stay in the (pooled) browser context
+    and are copied into other contexts before they visit the domain, so
+    the banner normally never shows again. `languages` limits the built-in
+    labels; `extra_labels` and `extra_selectors` add site-specific ones.
+    """
+
+    def __init__(self, languages=None, extra_labels=(), extra_selectors=(), max_domains=1000):
+        languages = languages or list(CONSENT_LABELS)
+        unknown = set(languages) - set(CONSENT_LABELS)
+        if unknown:
+            raise ValueError(f"Unknown consent languages: {', '.join(sorted(unknown))}")
+
+        labels = [label for language in languages for label in CONSENT_LABELS[language]]
+        self.labels = sorted({label.strip().lower() for label in [*labels, *extra_labels] if label.strip()})
+        self.selectors = [*CONSENT_SELECTORS, *extra_selectors]
+        self.max_domains = max_domains
+
+        self._domains = OrderedDict()
+        self._applied = weakref.WeakKeyDictionary()
+
+    def _remember(self, domain, **fields):
+        entry = self._domains.setdefault(domain, {'banner': None, 'cookies': []})
+        entry.update(fields, checked_at=time.time())
+        self._domains.move_to_end(domain)
+        while len(self._domains) > self.max_domains:
+            self._domains.popitem(last=False)
+        return entry
+
+    def _applied_domains(self, context):
+        try:
+            return self._applied.setdefault(context, set())
+        except TypeError:
+            # Not weak-referenceable: skip per-context tracking
+            return set()
+
+    async def prepare(self, context, url):
+        """Copy remembered consent cookies for `url`'s domain into `context`"""
+        domain = consent_domain(url)
+        entry = self._domains.get(domain)
+        applied = self._applied_domains(context)
+        if not entry or not entry['cookies'] or domain in applied:
+            return
+        try:
+            await context.add_cookies(entry['cookies'])
+            applied.add(domain)
+        except Exception as e:
+            logger.debug("Could not apply consent cookies for %s: %s", domain, e)
+
+    async def handle(self, page, url=None, wait_ms=CONSENT_SERP_WAIT_MS):
+        """
+        Accept a consent banner on `page` if there is one.
+
+        `url` is the address that was requested (the page may sit on a
+        consent redirect). Waits up to `wait_ms` for a banner unless the
+        domain is known to be banner-free or was already accepted in this
+        context, in which case a single check is made. Returns
+        {'clicked', 'via', 'waited_ms'}; 'clicked' is None if the check
+        was interrupted.
+        """
+        url = url or page.url
+        domain = consent_domain(url)
+        entry = self._domains.get(domain)
+        context = page.context
+        if (entry and entry['banner'] is False) or domain in self._applied_domains(context):
+            wait_ms = 0
+
+        args = {'selector': ', '.join(self.selectors), 'labels': self.labels,
+                'waitMs': wait_ms, 'pollMs': CONSENT_POLL_MS}
+        try:
+            result = await page.evaluate(CONSENT_SCRIPT, args)
+            if not result['clicked']:
+                result = await self._handle_frames(page, args)
+        except Exception as e:
+            # Navigation (often the click itself) destroyed the document
+            logger.debug("Consent check on %s interrupted: %s", domain, e)
+            return {'clicked': None, 'via': None, 'waited_ms': wait_ms}
+        result['waited_ms'] = wait_ms
+
+        if not result['clicked']:
+            if wait_ms:
+                self._remember(domain, banner=False)
+            return result
+
+        logger.debug("Consent accepted on %s via %s", domain, result['via'])
+        try:
+            await page.wait_for_load_state('domcontentloaded', timeout=5000)
+            cookies = await context.cookies(url)
+        except Exception:
+            cookies = []
+        self._remember(domain, banner=True, cookies=cookies)
+        self._applied_domains(context).add(domain)
+        return result
+
+    async def _handle_frames(self, page, args):
+        """Single check in child frames that look like consent platforms"""
+        frames = [
+            frame for frame in page.frames
+            if frame is not page.main_frame
+            and any(hint in frame.url.lower() for hint in CONSENT_FRAME_HINTS)
+        ]
+        for frame in frames:
+            try:
+                result = await frame.evaluate(CONSENT_SCRIPT, {**args, 'waitMs': 0})
+            except Exception:
+                continue
+            if result['clicked']:
+                return result
+        return {'clicked': False, 'via': None}
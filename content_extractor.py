@@ -0,0 +1,571 @@
+"""
+Content Extractor Module
+Extraction rules for result pages, run in-page in a single round-trip or on fetched HTML
+"""
+
+import json
+import re
+from functools import lru_cache
+from math import inf
+from urllib.parse import urljoin
+
+from selectolax.lexbor import LexborHTMLParser
+
+# Containers tried in order when scoring finds no clear main content
+MAIN_SELECTORS = [
+    'article',
+    'main',
+    '[role="main"]',
+    '.article-content',
+    '.post-content',
+    '.content',
+    '#content',
+    '.article-body',
+    '.entry-content'
+]
+
+MAX_HEADINGS = 30
+MAX_PARAGRAPHS = 50
+MIN_PARAGRAPH_LENGTH = 20
+MAX_TEXT_LENGTH = 20000
+MAX_JSON_LD_BLOCKS = 5
+
+# Main-content scoring: text blocks vote for their three nearest ancestors
+# (full, half and a third of their points); an ancestor's total is weighted
+# by its tag and class/id words and scaled down by its link density
+SCORED_TAGS = 'p, pre, blockquote, td, li, dd'
+MIN_SCORED_LENGTH = 25
+
+POSITIVE_PATTERN = r'article|body|content|entry|hentry|main|post|story|text|testo|blog'
+NEGATIVE_PATTERN = (
+    r'\bads?\b|advert|banner|breadcrumb|comment|consent|cookie|footer|gdpr|masthead|menu|'
+    r'modal|\bnav|newsletter|outbrain|popup|promo|related|share|sidebar|social|sponsor|'
+    r'subscribe|taboola|widget'
+)
+CLASS_WEIGHT = 25
+
+TAG_WEIGHTS = {
+    'article': 25, 'main': 20,
+    'div': 5, 'section': 5,
+    'blockquote': 3, 'pre': 3, 'td': 3,
+    'address': -3, 'dd': -3, 'dl': -3, 'dt': -3, 'form': -3, 'li': -3, 'ol': -3, 'ul': -3,
+    'header': -5, 'th': -5,
+}
+
+# Never main content: skipped when scoring and left out of the text
+BOILERPLATE_SELECTOR = (
+    'nav, aside, footer, [role="navigation"], [role="complementary"], '
+    '[role="contentinfo"], [role="dialog"], [aria-modal="true"]'
+)
+
+# Blocks inside the chosen container dropped when they are forms, have
+# boilerplate class/id words or are mostly links
+PRUNE_TAGS = 'div, section, ul, ol, table, form'
+MAX_LINK_DENSITY = 0.5
+
+# Below this score the page has no clear article and MAIN_SELECTORS is used;
+# an ancestor scoring at least CLIMB_RATIO of the best replaces it
+# (content split over sibling blocks)
+MIN_CANDIDATE_SCORE = 10
+CLIMB_RATIO = 0.8
+
+EXTRACTION_CONFIG = {
+    'mainSelectors': MAIN_SELECTORS,
+    'maxHeadings': MAX_HEADINGS,
+    'maxParagraphs': MAX_PARAGRAPHS,
+    'minParagraphLength': MIN_PARAGRAPH_LENGTH,
+    'maxTextLength': MAX_TEXT_LENGTH,
+    'maxJsonLd': MAX_JSON_LD_BLOCKS,
+    'scoring': True,
+    'scoredTags': SCORED_TAGS,
+    'minScoredLength': MIN_SCORED_LENGTH,
+    'positivePattern': POSITIVE_PATTERN,
+    'negativePattern': NEGATIVE_PATTERN,
+    'classWeight': CLASS_WEIGHT,
+    'tagWeights': TAG_WEIGHTS,
+    'boilerplateSelector': BOILERPLATE_SELECTOR,
+    'pruneTags': PRUNE_TAGS,
+    'maxLinkDensity': MAX_LINK_DENSITY,
+    'minCandidateScore': MIN_CANDIDATE_SCORE,
+    'climbRatio': CLIMB_RATIO,
+}
+
+# Whole extraction pipeline, evaluated with EXTRACTION_CONFIG as argument
+EXTRACTION_SCRIPT = """
+(cfg) => {
+    const text = (el) => ((el && el.innerText) || '').trim();
+    const attr = (selector, name) => {
+        const el = document.querySelector(selector);
+        return el ? el.getAttribute(name) : null;
+    };
+
+    // Hidden via an inline style for the duration of the call, then restored
+    const hidden = [];
+    const hide = (el) => {
+        hidden.push([el, el.style.getPropertyValue('display'), el.style.getPropertyPriority('display')]);
+        el.setAttribute('data-steel-hidden', '');
+        el.style.setProperty('display', 'none', 'important');
+    };
+    const shown = (el) => !el.closest('[data-steel-hidden]');
+    const describe = (el) => {
+        let name = el.tagName.toLowerCase();
+        if (el.id) name += '#' + el.id;
+        const cls = (el.getAttribute('class') || '').trim().split(/\s+/)[0];
+        if (cls) name += '.' + cls;
+        return name;
+    };
+
+    // Main content: scored container with boilerplate hidden while reading it
+    const content = () => {
+        const body = document.body;
+        let container = null;
+        let matched = null;
+        if (body && cfg.scoring) {
+            const positive = new RegExp(cfg.positivePattern, 'i');
+            const negative = new RegExp(cfg.negativePattern, 'i');
+            const classWeight = (el) => {
+                let weight = 0;
+                for (const value of [el.getAttribute('class'), el.id]) {
+                    if (!value) continue;
+                    if (negative.test(value)) weight -= cfg.classWeight;
+                    if (positive.test(value)) weight += cfg.classWeight;
+                }
+                return weight;
+            };
+            for (const el of body.querySelectorAll(cfg.boilerplateSelector)) hide(el);
+
+            // Characters of visible link text under each element
+            const linkLength = new Map();
+            for (const a of body.querySelectorAll('a')) {
+                const length = shown(a) ? text(a).length : 0;
+                if (!length) continue;
+                for (let el = a.parentElement; el && el !== body; el = el.parentElement) {
+                    linkLength.set(el, (linkLength.get(el) || 0) + length);
+                }
+            }
+            const linkDensity = (el) => {
+                const links = linkLength.get(el);
+                if (!links) return 0;
+                const length = text(el).length;
+                return length ? Math.min(links / length, 1) : 0;
+            };
+
+            const scores = new Map();
+            const unlikely = new Set();
+            for (const el of body.querySelectorAll(cfg.scoredTags)) {
+                // Blocks wrapping other scored blocks leave the voting to the inner ones
+                if (!shown(el) || el.querySelector(cfg.scoredTags)) continue;
+                const t = text(el);
+                if (t.length < cfg.minScoredLength) continue;
+                const points = t.split(',').length + Math.min(Math.floor(t.length / 100), 3);
+                let ancestor = el.parentElement;
+                for (let level = 0; level < 3 && ancestor && ancestor !== body; level++) {
+                    if (!scores.has(ancestor)) {
+                        const weight = classWeight(ancestor);
+                        if (weight < 0) unlikely.add(ancestor);
+                        scores.set(ancestor, (cfg.tagWeights[ancestor.tagName.toLowerCase()] || 0) + weight);
+                    }
+                    scores.set(ancestor, scores.get(ancestor) + points / (level + 1));
+                    // Comments, related links etc. don't lift the blocks around them
+                    if (unlikely.has(ancestor)) break;
+                    ancestor = ancestor.parentElement;
+                }
+            }
+
+            const ranked = new Map();
+            let best = null;
+            let bestScore = -Infinity;
+            for (const [el, score] of scores) {
+                const value = score * (1 - linkDensity(el));
+                ranked.set(el, value);
+                if (value > bestScore) {
+                    best = el;
+                    bestScore = value;
+                }
+            }
+            if (best && bestScore >= cfg.minCandidateScore) {
+                while (ranked.has(best.parentElement) && ranked.get(best.parentElement) >= bestScore * cfg.climbRatio) {
+                    best = best.parentElement;
+                }
+                for (const el of best.querySelectorAll(cfg.pruneTags)) {
+                    if (!shown(el)) continue;
+                    if (el.tagName === 'FORM' || classWeight(el) < 0 || linkDensity(el) > cfg.maxLinkDensity) {
+                        hide(el);
+                    }
+                }
+                container = best;
+                matched = describe(best);
+            }
+        }
+
+        if (!container) {
+            for (const selector of cfg.mainSelectors) {
+                try {
+                    container = document.querySelector(selector);
+                } catch (e) {
+                    container = null;
+                }
+                if (container) {
+                    matched = selector;
+                    break;
+                }
+            }
+        }
+        if (!container) {
+            container = body;
+            matched = container ? 'body' : null;
+        }
+
+        const headings = [];
+        const paragraphs = [];
+        let mainText = '';
+        if (container) {
+            const visible = (selector) => Array.from(container.querySelectorAll(selector)).filter(shown);
+            for (const h of visible('h1, h2, h3, h4').slice(0, cfg.maxHeadings)) {
+                const t = text(h);
+                if (t.length > 0) headings.push(t);
+            }
+            for (const p of visible('p').slice(0, cfg.maxParagraphs)) {
+                const t = text(p);
+                if (t.length > cfg.minParagraphLength) paragraphs.push(t);
+            }
+            mainText = container.innerText || '';
+        }
+        return {matched: matched, headings: headings, paragraphs: paragraphs, mainText: mainText};
+    };
+
+    let main;
+    try {
+        main = content();
+    } finally {
+        for (const [el, value, priority] of hidden) {
+            el.removeAttribute('data-steel-hidden');
+            if (value) {
+                el.style.setProperty('display', value, priority);
+            } else {
+                el.style.removeProperty('display');
+            }
+        }
+    }
+
+    // Metadata
+    const metadata = {};
+    const description = document.querySelector('meta[name="description"]');
+    if (description) metadata.description = description.getAttribute('content');
+
+    const canonical = document.querySelector('link[rel="canonical"]');
+    if (canonical && canonical.href) metadata.canonical = canonical.href;
+
+    const author = attr('meta[name="author"]', 'content')
+        || attr('meta[property="article:author"]', 'content');
+    if (author) metadata.author = author;
+
+    const published = attr('meta[property="article:published_time"]', 'content')
+        || attr('meta[itemprop="datePublished"]', 'content')
+        || attr('meta[name="date"]', 'content')
+        || attr('time[datetime]', 'datetime');
+    if (published) metadata.published_time = published;
+
+    const modified = attr('meta[property="article:modified_time"]', 'content')
+        || attr('meta[itemprop="dateModified"]', 'content');
+    if (modified) metadata.modified_time = modified;
+
+    const lang = document.documentElement && document.documentElement.lang;
+    if (lang) metadata.language = lang;
+
+    const og = {};
+    for (const el of document.querySelectorAll('meta[property^="og:"]')) {
+        const key = el.getAttribute('property').slice(3);
+        if (key && !(key in og)) og[key] = el.getAttribute('content');
+    }
+    if (Object.keys(og).length) metadata.og = og;
+
+    const jsonLd = [];
+    for (const el of document.querySelectorAll('script[type="application/ld+json"]')) {
+        if (jsonLd.length >= cfg.maxJsonLd) break;
+        try {
+            jsonLd.push(JSON.parse(el.textContent));
+        } catch (e) {}
+    }
+    if (jsonLd.length) metadata.json_ld = jsonLd;
+
+    return {
+        title: document.title || '',
+        container: main.matched,
+        headings: main.headings,
+        paragraphs: main.paragraphs,
+        main_text: main.mainText.slice(0, cfg.maxTextLength),
+        main_text_length: main.mainText.length,
+        metadata: metadata
+    };
+}
+"""
+
+
+async def extract_from_page(page, config=EXTRACTION_CONFIG):
+    """Run the extraction pipeline in the page with one evaluate call"""
+    return await page.evaluate(EXTRACTION_SCRIPT, config)
+
+
+# Elements that end a line in innerText, and elements innerText never shows
+BLOCK_TAGS = (
+    'address, article, aside, blockquote, br, dd, div, dl, dt, figcaption, figure, footer, '
+    'form, h1, h2, h3, h4, h5, h6, header, hr, li, main, nav, ol, p, pre, section, table, '
+    'tr, ul'
+)
+HIDDEN_TAGS = 'script, style, noscript, template, svg, iframe, [hidden]'
+
+
+SPACE_PATTERN = re.compile(r'[ \t\r\f\v\u00a0]+')
+
+
+def _collapse(text):
+    """Whitespace handling close to innerText: spaces collapsed, one line per block"""
+    lines = (line.strip() for line in SPACE_PATTERN.sub(' ', text).split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+def _text(node):
+    return _collapse(node.text(deep=True, separator='')) if node else ''
+
+
+def _attr(tree, selector, name):
+    node = tree.css_first(selector)
+    return node.attributes.get(name) if node else None
+
+
+def _remove(nodes):
+    """Decompose `nodes` (in document order), skipping those inside one already removed"""
+    # Nodes are keyed by mem_id: comparing LexborNode objects is slow
+    removed = {}
+    for node in nodes:
+        parent = node.parent
+        while parent is not None and parent.mem_id not in removed:
+            parent = parent.parent
+        if parent is None:
+            removed[node.mem_id] = node
+    for node in removed.values():
+        node.decompose()
+
+
+@lru_cache(maxsize=8)
+def _patterns(positive, negative):
+    return re.compile(positive, re.IGNORECASE), re.compile(negative, re.IGNORECASE)
+
+
+def _describe(node):
+    name = node.tag
+    if node.attributes.get('id'):
+        name += '#' + node.attributes['id']
+    classes = (node.attributes.get('class') or '').split()
+    if classes:
+        name += '.' + classes[0]
+    return name
+
+
+def _scored_container(body, cfg):
+    """Highest-scoring main content container, with boilerplate blocks pruned, or None"""
+    positive, negative = _patterns(cfg['positivePattern'], cfg['negativePattern'])
+
+    def class_weight(node):
+        weight = 0
+        for value in (node.attributes.get('class'), node.attributes.get('id')):
+            if not value:
+                continue
+            if negative.search(value):
+                weight -= cfg['classWeight']
+            if positive.search(value):
+                weight += cfg['classWeight']
+        return weight
+
+    # Characters of link text under each element
+    body_id = body.mem_id
+    link_length = {}
+    for anchor in body.css('a'):
+        length = len(_text(anchor))
+        if not length:
+            continue
+        node = anchor.parent
+        while node is not None and node.mem_id != body_id:
+            link_length[node.mem_id] = link_length.get(node.mem_id, 0) + length
+            node = node.parent
+
+    text_length = {}
+
+    def link_density(node):
+        links = link_length.get(node.mem_id)
+        if not links:
+            return 0
+        length = text_length.get(node.mem_id)
+        if length is None:
+            length = text_length[node.mem_id] = len(_text(node))
+        return min(links / length, 1) if length else 0
+
+    # Blocks wrapping other scored blocks (layout cells, list items with
+    # paragraphs) leave the voting to the inner ones
+    blocks = body.css(cfg['scoredTags'])
+    block_ids = {node.mem_id for node in blocks}
+    wrappers = set()
+    for node in blocks:
+        parent = node.parent
+        while parent is not None and parent.mem_id != body_id:
+            if parent.mem_id in block_ids:
+                wrappers.add(parent.mem_id)
+                break
+            parent = parent.parent
+
+    nodes = {}
+    scores = {}
+    unlikely = set()
+    for node in blocks:
+        if node.mem_id in wrappers:
+            continue
+        text = _text(node)
+        if len(text) < cfg['minScoredLength']:
+            continue
+        points = 1 + text.count(',') + min(len(text) // 100, 3)
+        ancestor = node.parent
+        for level in range(3):
+            if ancestor is None or ancestor.mem_id == body_id:
+                break
+            key = ancestor.mem_id
+            if key not in scores:
+                nodes[key] = ancestor
+                weight = class_weight(ancestor)
+                if weight < 0:
+                    unlikely.add(key)
+                scores[key] = cfg['tagWeights'].get(ancestor.tag, 0) + weight
+            scores[key] += points / (level + 1)
+            # Comments, related links etc. don't lift the blocks around them
+            if key in unlikely:
+                break
+            ancestor = ancestor.parent
+
+    ranked = {key: score * (1 - link_density(nodes[key])) for key, score in scores.items()}
+    if not ranked:
+        return None
+    best = max(ranked, key=ranked.get)
+    best_score = ranked[best]
+    if best_score < cfg['minCandidateScore']:
+        return None
+    container = nodes[best]
+    while container.parent is not None \
+            and ranked.get(container.parent.mem_id, -inf) >= best_score * cfg['climbRatio']:
+        container = container.parent
+
+    _remove([
+        node for node in container.css(cfg['pruneTags'])
+        if node.mem_id != container.mem_id and (
+            node.tag == 'form' or class_weight(node) < 0
+            or link_density(node) > cfg['maxLinkDensity']
+        )
+    ])
+    return container
+
+
+def extract_from_html(html, url=None, config=EXTRACTION_CONFIG):
+    """
+    Same rules as EXTRACTION_SCRIPT applied to an HTML string; returns the
+    same fields. Text is an approximation of innerText (no CSS layout).
+    """
+    cfg = config
+    tree = LexborHTMLParser(html)
+
+    # Metadata first: JSON-LD lives in <script> tags removed below
+    metadata = {}
+    description = _attr(tree, 'meta[name="description"]', 'content')
+    if description:
+        metadata['description'] = description
+
+    canonical = _attr(tree, 'link[rel="canonical"]', 'href')
+    if canonical:
+        metadata['canonical'] = urljoin(url, canonical) if url else canonical
+
+    author = _attr(tree, 'meta[name="author"]', 'content') \
+        or _attr(tree, 'meta[property="article:author"]', 'content')
+    if author:
+        metadata['author'] = author
+
+    published = _attr(tree, 'meta[property="article:published_time"]', 'content') \
+        or _attr(tree, 'meta[itemprop="datePublished"]', 'content') \
+        or _attr(tree, 'meta[name="date"]', 'content') \
+        or _attr(tree, 'time[datetime]', 'datetime')
+    if published:
+        metadata['published_time'] = published
+
+    modified = _attr(tree, 'meta[property="article:modified_time"]', 'content') \
+        or _attr(tree, 'meta[itemprop="dateModified"]', 'content')
+    if modified:
+        metadata['modified_time'] = modified
+
+    language = _attr(tree, 'html', 'lang')
+    if language:
+        metadata['language'] = language
+
+    og = {}
+    for node in tree.css('meta[property^="og:"]'):
+        key = (node.attributes.get('property') or '')[3:]
+        if key and key not in og:
+            og[key] = node.attributes.get('content')
+    if og:
+        metadata['og'] = og
+
+    json_ld = []
+    for node in tree.css('script[type="application/ld+json"]'):
+        if len(json_ld) >= cfg['maxJsonLd']:
+            break
+        try:
+            json_ld.append(json.loads(node.text(deep=True)))
+        except ValueError:
+            pass
+    if json_ld:
+        metadata['json_ld'] = json_ld
+
+    title = _text(tree.css_first('title'))
+    _remove(tree.css(HIDDEN_TAGS))
+    body = tree.body
+    if body is not None:
+        for node in body.css(BLOCK_TAGS):
+            node.insert_after('\n')
+
+    # Main content container
+    container = None
+    matched = None
+    if body is not None and cfg.get('scoring'):
+        _remove(body.css(cfg['boilerplateSelector']))
+        container = _scored_container(body, cfg)
+        if container is not None:
+            matched = _describe(container)
+    if container is None:
+        for selector in cfg['mainSelectors']:
+            container = tree.css_first(selector)
+            if container is not None:
+                matched = selector
+                break
+    if container is None:
+        container = body
+        matched = 'body' if container is not None else None
+
+    headings = []
+    paragraphs = []
+    main_text = ''
+    if container is not None:
+        for node in container.css('h1, h2, h3, h4')[:cfg['maxHeadings']]:
+            text = _text(node)
+            if text:
+                headings.append(text)
+        for node in container.css('p')[:cfg['maxParagraphs']]:
+            text = _text(node)
+            if len(text) > cfg['minParagraphLength']:
+                paragraphs.append(text)
+        main_text = _text(container)
+
+    return {
+        'title': title,
+        'container': matched,
+        'headings': headings,
+        'paragraphs': paragraphs,
+        'main_text': main_text[:cfg['maxTextLength']],
+        'main_text_length': len(main_text),
+        'metadata': metadata,
+    }
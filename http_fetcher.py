@@ -0,0 +1,138 @@
+"""
+HTTP Fetcher Module
+Plain HTTP fetch for server-rendered result pages, with checks for when a browser is needed
+"""
+
+import re
+import httpx
+
+
+# auto: HTTP first, browser when the page looks JS-rendered or blocked;
+# browser: always a Chromium tab; http: never a browser (such pages fail)
+FETCH_MODES = ['auto', 'browser', 'http']
+
+DEFAULT_USER_AGENT = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36'
+)
+
+# Below this much main text a static page is assumed to be rendered client-side
+MIN_STATIC_TEXT_LENGTH = 400
+
+# Markers of bot challenges and JS-only shells, checked in the raw HTML of short pages
+BLOCKED_MARKERS = [
+    'cf-browser-verification',
+    'challenge-platform',
+    '<title>just a moment...</title>',
+    'g-recaptcha',
+    'hcaptcha.com',
+    'px-captcha',
+    '_incapsula_resource',
+    'datadome',
+]
+JS_REQUIRED_MARKERS = [
+    'enable javascript',
+    'javascript is required',
+    'javascript is disabled',
+    'please turn on javascript',
+    'abilita javascript',
+]
+
+def accept_language(language):
+    """Accept-Language header preferring `language` (e.g. 'it'), English as fallback"""
+    if language == 'en':
+        return 'en'
+    return f'{language},en;q=0.8'
+
+
+CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+
+
+def _decode(body, header_encoding):
+    encoding = header_encoding
+    if not encoding:
+        match = CHARSET_PATTERN.search(body[:4096])
+        encoding = match.group(1).decode('ascii') if match else 'utf-8'
+    try:
+        return body.decode(encoding, errors='replace')
+    except LookupError:
+        return body.decode('utf-8', errors='replace')
+
+
+class HttpFetcher:
+    """
+    Pooled keep-alive HTTP client for result pages.
+
+    Bodies are read up to `max_bytes`; non-HTML responses are not
+    downloaded at all.
+    """
+
+    def __init__(self, timeout=10, max_bytes=3_000_000, max_connections=50,
+                 user_agent=DEFAULT_USER_AGENT):
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self._http = httpx.AsyncClient(
+            follow_redirects=True,
+            headers={
+                'User-Agent': user_agent,
+                'Accept': 'text/html,application/xhtml+xml;q=0.9,*/*;q=0.8',
+                'Accept-Language': 'it-IT,it;q=0.9,en;q=0.8',
+            },
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections),
+        )
+
+    async def fetch(self, url, timeout=None, etag=None, last_modified=None, language=None):
+        """
+        GET `url`; returns {'url', 'status', 'content_type', 'html', 'etag', 'last_modified'}
+
+        With the validators of an earlier response the request is
+        conditional, and an unchanged page answers 304 with no body.
+        `language` sets Accept-Language (default: Italian).
+        """
+        timeout = min(self.timeout, timeout) if timeout is not None else self.timeout
+        headers = {}
+        if language:
+            headers['Accept-Language'] = accept_language(language)
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        async with self._http.stream('GET', url, timeout=timeout, headers=headers) as response:
+            content_type = response.headers.get('content-type', '').lower()
+            body = bytearray()
+            if 'html' in content_type:
+                async for chunk in response.aiter_bytes():
+                    body.extend(chunk)
+                    if len(body) >= self.max_bytes:
+                        break
+            charset = response.charset_encoding
+            return {
+                'url': str(response.url),
+                'status': response.status_code,
+                'content_type': content_type,
+                'html': _decode(body, charset) if body else '',
+                'etag': response.headers.get('etag'),
+                'last_modified': response.headers.get('last-modified'),
+            }
+
+    async def close(self):
+        await self._http.aclose()
+
+
+def fallback_reason(response, data):
+    """Why a fetched page needs the browser, or None if the static extraction is usable"""
+    if response['status'] >= 400:
+        return f"http_{response['status']}"
+    if 'html' not in response['content_type']:
+        return 'not_html'
+    if data is not None and data['main_text_length'] >= MIN_STATIC_TEXT_LENGTH:
+        return None
+    # Little text: tell challenge pages and JS shells from plain short pages
+    head = response['html'][:50000].lower()
+    if any(marker in head for marker in BLOCKED_MARKERS):
+        return 'blocked'
+    if any(marker in head for marker in JS_REQUIRED_MARKERS):
+        return 'js_required'
+    return 'too_little_text'
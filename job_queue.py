@@ -0,0 +1,299 @@
+"""
+Job Queue Module
+In-process worker pool for long-running scrapes with pluggable job storage
+"""
+
+import asyncio
+import bisect
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from tracing import request_id_var
+
+
+JOB_STATUSES = ['queued', 'running', 'completed', 'failed', 'cancelled']
+FINISHED_STATUSES = {'completed', 'failed', 'cancelled'}
+
+
+class QueueFull(Exception):
+    pass
+
+
+class QueueClosed(Exception):
+    pass
+
+
+class JobNotFound(Exception):
+    pass
+
+
+class MemoryJobStore:
+    """Jobs kept in a dict; lost on restart"""
+
+    def __init__(self):
+        self._jobs = {}
+
+    async def save(self, job):
+        self._jobs[job['id']] = json.loads(json.dumps(job))
+
+    async def get(self, job_id):
+        job = self._jobs.get(job_id)
+        return json.loads(json.dumps(job)) if job else None
+
+    async def list_unfinished(self):
+        return [job for job in self._jobs.values() if job['status'] not in FINISHED_STATUSES]
+
+    async def purge(self, older_than):
+        for job_id in [j['id'] for j in self._jobs.values()
+                       if j['status'] in FINISHED_STATUSES and j['updated_at'] < older_than]:
+            del self._jobs[job_id]
+
+    def close(self):
+        pass
+
+
+class SQLiteJobStore:
+    """Jobs persisted as JSON documents in a local SQLite file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            ' id TEXT PRIMARY KEY, status TEXT NOT NULL,'
+            ' updated_at REAL NOT NULL, data TEXT NOT NULL)'
+        )
+        self._db.commit()
+
+    def _save(self, job):
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO jobs (id, status, updated_at, data) VALUES (?, ?, ?, ?)',
+                (job['id'], job['status'], job['updated_at'], json.dumps(job))
+            )
+            self._db.commit()
+
+    def _get(self, job_id):
+        with self._lock:
+            row = self._db.execute('SELECT data FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _list_unfinished(self):
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT data FROM jobs WHERE status IN ({})'.format(
+                    ','.join('?' * (len(JOB_STATUSES) - len(FINISHED_STATUSES)))),
+                [s for s in JOB_STATUSES if s not in FINISHED_STATUSES]
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def _purge(self, older_than):
+        with self._lock:
+            self._db.execute(
+                'DELETE FROM jobs WHERE status IN ({}) AND updated_at < ?'.format(
+                    ','.join('?' * len(FINISHED_STATUSES))),
+                [*FINISHED_STATUSES, older_than]
+            )
+            self._db.commit()
+
+    async def save(self, job):
+        await asyncio.to_thread(self._save, job)
+
+    async def get(self, job_id):
+        return await asyncio.to_thread(self._get, job_id)
+
+    async def list_unfinished(self):
+        return await asyncio.to_thread(self._list_unfinished)
+
+    async def purge(self, older_than):
+        await asyncio.to_thread(self._purge, older_than)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class JobQueue:
+    """
+    Bounded queue of scrape jobs processed by `concurrency` workers.
+
+    `runner(payload, on_event)` performs one job; it is awaited with the
+    job's request payload and an event callback receiving the 'serp' and
+    'result' events of SteelBrowserScraper.search_and_extract, and returns
+    the request-level report. Submitting while `max_queued` jobs are
+    waiting raises QueueFull.
+
+    Unfinished jobs are read from memory, so a running job is written to
+    the store at most every `save_interval` seconds, and always when it
+    finishes.
+    """
+
+    def __init__(self, runner, store=None, concurrency=2, max_queued=100, retention=86400,
+                 save_interval=5):
+        self.runner = runner
+        self.store = store or MemoryJobStore()
+        self.concurrency = concurrency
+        self.max_queued = max_queued
+        self.retention = retention
+        self.save_interval = save_interval
+
+        self._queue = asyncio.Queue()
+        self._jobs = {}
+        self._running = {}
+        self._workers = []
+        self._closing = False
+
+    async def start(self):
+        # Jobs that were queued or running when the server stopped can't resume
+        for job in await self.store.list_unfinished():
+            job['status'] = 'failed'
+            job['error'] = 'Interrupted by server restart'
+            job['finished_at'] = datetime.now().isoformat()
+            job['updated_at'] = time.time()
+            await self.store.save(job)
+        await self.store.purge(time.time() - self.retention)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    def stop_intake(self):
+        """Refuse new jobs and start no queued ones (shutdown); running jobs carry on"""
+        self._closing = True
+
+    async def close(self, drain_timeout=0):
+        """Stop the workers; running jobs get up to `drain_timeout` seconds to finish first"""
+        # Workers take no new jobs from here on; still-queued ones end up cancelled below
+        self.stop_intake()
+        running = list(self._running.values())
+        if running and drain_timeout:
+            await asyncio.wait(running, timeout=drain_timeout)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for job_id in list(self._jobs):
+            job = self._jobs.pop(job_id)
+            if job['status'] not in FINISHED_STATUSES:
+                await self._finish(job, 'cancelled', error='Server shutting down')
+        self.store.close()
+
+    def queued(self):
+        return sum(1 for job in self._jobs.values() if job['status'] == 'queued')
+
+    async def submit(self, payload):
+        """Queue a job and return its record"""
+        if self._closing:
+            raise QueueClosed("Server shutting down")
+        if self.queued() >= self.max_queued:
+            raise QueueFull(f"Job queue is full ({self.max_queued} jobs waiting)")
+
+        now = datetime.now().isoformat()
+        job = {
+            'id': uuid.uuid4().hex,
+            'status': 'queued',
+            'created_at': now,
+            'started_at': None,
+            'finished_at': None,
+            'updated_at': time.time(),
+            'request': payload,
+            'progress': {'completed': 0, 'total': None},
+            'results': [],
+            'error': None,
+            'report': {},
+        }
+        self._jobs[job['id']] = job
+        await self.store.save(job)
+        self._queue.put_nowait(job['id'])
+        return job
+
+    async def get(self, job_id):
+        job = self._jobs.get(job_id) or await self.store.get(job_id)
+        if job is None:
+            raise JobNotFound(job_id)
+        return job
+
+    async def cancel(self, job_id):
+        """Cancel a queued or running job; finished jobs are returned unchanged"""
+        job = await self.get(job_id)
+        if job['status'] == 'queued':
+            await self._finish(job, 'cancelled')
+        elif job['status'] == 'running' and job_id in self._running:
+            task = self._running[job_id]
+            task.cancel()
+            # Give the scrape a moment to unwind so the reply shows 'cancelled'
+            await asyncio.wait({task}, timeout=5)
+            await asyncio.sleep(0)
+            job = await self.get(job_id)
+        return job
+
+    def stats(self):
+        return {
+            'concurrency': self.concurrency,
+            'max_queued': self.max_queued,
+            'queued': self.queued(),
+            'running': len(self._running),
+        }
+
+    async def _worker(self):
+        while not self._closing:
+            job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            if job is None or job['status'] != 'queued' or self._closing:
+                continue
+
+            job['status'] = 'running'
+            job['started_at'] = datetime.now().isoformat()
+            job['updated_at'] = time.time()
+            await self.store.save(job)
+
+            # The scrape task's log lines carry the job id as their request id
+            request_id_var.set(job_id)
+            task = asyncio.create_task(self.runner(job['request'], self._event_handler(job)))
+            self._running[job_id] = task
+            try:
+                job['report'] = await task
+                await self._finish(job, 'completed')
+            except asyncio.CancelledError:
+                if not task.cancelled():
+                    # The worker itself is being stopped
+                    task.cancel()
+                    raise
+                # Cancelling the worker mid-job cancels the job's task, landing here too
+                await self._finish(job, 'cancelled', error='Server shutting down' if self._closing else None)
+            except Exception as e:
+                await self._finish(job, 'failed', error=str(e))
+            finally:
+                self._running.pop(job_id, None)
+
+    def _event_handler(self, job):
+        last_saved = time.monotonic()
+
+        async def on_event(event):
+            nonlocal last_saved
+            if event['type'] == 'serp':
+                job['progress']['total'] = len(event['results'])
+            elif event['type'] == 'result':
+                bisect.insort(job['results'], event['result'], key=lambda r: r['position'])
+                job['progress']['completed'] += 1
+            elif event['type'] == 'unchanged':
+                # Left out of the results of a changes_only job, but still done
+                job['progress']['completed'] += 1
+            job['updated_at'] = time.time()
+            # Rewriting the whole record per event would be quadratic in the results
+            if time.monotonic() - last_saved >= self.save_interval:
+                last_saved = time.monotonic()
+                await self.store.save(job)
+        return on_event
+
+    async def _finish(self, job, status, error=None):
+        job['status'] = status
+        job['error'] = error
+        job['finished_at'] = datetime.now().isoformat()
+        job['updated_at'] = time.time()
+        await self.store.save(job)
+        # Finished jobs are served from the store from now on
+        self._jobs.pop(job['id'], None)
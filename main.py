@@ -3,20 +3,242 @@ Steel Browser API - FastAPI Server
 REST API for web scraping with Steel Browser on Railway
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
+from contextlib import asynccontextmanager
 import os
+import asyncio
+import json
+import math
+import time
+import uuid
 from datetime import datetime
 
 from steel_scraper import SteelBrowserScraper
+from steel_backends import SteelBalancer, parse_steel_urls
+from session_pool import SteelSessionPool
+from wait_strategy import WAIT_STRATEGIES
+from resource_blocking import BLOCK_CATEGORIES
+from result_cache import ResultCache, CACHE_MODES
+from consent import ConsentHandler
+from http_fetcher import HttpFetcher, FETCH_MODES
+from job_queue import JobQueue, SQLiteJobStore, MemoryJobStore, QueueFull, QueueClosed, JobNotFound
+from admission import AdmissionController, RateLimiter, AdmissionRejected, PRIORITIES, parse_rate_limits
+from response_encoding import CompressionMiddleware, PARAGRAPH_FORMATS, encode_result, parse_fields
+from tracing import configure_logging, request_id_var
+from metrics import REGISTRY, IN_FLIGHT, POOL_SESSIONS, BACKEND_SESSIONS, BACKEND_UP, MEMORY, resident_memory_bytes
+
+# Get Steel Browser URL from environment variable; STEEL_URLS (comma-separated)
+# spreads sessions over several Steel instances instead
+STEEL_URL = os.getenv("STEEL_URL", "https://steel-browser-production-9a2a.up.railway.app")
+STEEL_URLS = parse_steel_urls(os.getenv("STEEL_URLS") or STEEL_URL)
+
+# Backend balancing: least_sessions or latency, consecutive failures before a
+# backend's circuit opens, seconds before it is tried again
+STEEL_BALANCE_STRATEGY = os.getenv("STEEL_BALANCE_STRATEGY", "least_sessions")
+STEEL_FAILURE_THRESHOLD = int(os.getenv("STEEL_FAILURE_THRESHOLD", 3))
+STEEL_CIRCUIT_RESET = float(os.getenv("STEEL_CIRCUIT_RESET", 30))
+
+# Warm session pool settings (STEEL_POOL_SIZE=0 disables the pool); beyond the warm
+# sessions, leases create overflow sessions on demand, at most STEEL_POOL_MAX_OVERFLOW
+# of them if set (unset: no cap of its own, admission control bounds concurrency)
+STEEL_POOL_SIZE = int(os.getenv("STEEL_POOL_SIZE", 2))
+STEEL_POOL_MAX_USES = int(os.getenv("STEEL_POOL_MAX_USES", 20))
+STEEL_POOL_MAX_IDLE = int(os.getenv("STEEL_POOL_MAX_IDLE", 240))
+STEEL_POOL_MAX_OVERFLOW = int(os.getenv("STEEL_POOL_MAX_OVERFLOW")) if os.getenv("STEEL_POOL_MAX_OVERFLOW") else None
+
+# Result cache settings (CACHE_MAX_ENTRIES=0 disables caching, CACHE_PATH adds a SQLite tier)
+CACHE_SERP_TTL = int(os.getenv("CACHE_SERP_TTL", 600))
+CACHE_PAGE_TTL = int(os.getenv("CACHE_PAGE_TTL", 3600))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 500))
+CACHE_PATH = os.getenv("CACHE_PATH")
+CACHE_SEEN_TTL = int(os.getenv("CACHE_SEEN_TTL", 604800))
+CACHE_SEEN_MAX_ENTRIES = int(os.getenv("CACHE_SEEN_MAX_ENTRIES", 10000))
+
+# Background job settings (JOBS_DB_PATH="" keeps jobs in memory only)
+JOBS_CONCURRENCY = int(os.getenv("JOBS_CONCURRENCY", 2))
+JOBS_MAX_QUEUED = int(os.getenv("JOBS_MAX_QUEUED", 100))
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "jobs.db")
+JOBS_SAVE_INTERVAL = float(os.getenv("JOBS_SAVE_INTERVAL", 5))
+
+# Admission control: scrapes running at once across /search, /search/stream, /search/batch
+# and jobs (0 = unlimited), and how many may wait, for how long, before a 503
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", 10))
+ADMISSION_MAX_QUEUED = int(os.getenv("ADMISSION_MAX_QUEUED", 50))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 30))
+
+# Per-client rate limits in searches per minute (0 = unlimited), with per-API-key
+# overrides in RATE_LIMIT_KEYS as "key=per_minute[:burst],..."
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", 0))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", 10))
+RATE_LIMIT_KEYS = parse_rate_limits(os.getenv("RATE_LIMIT_KEYS", ""))
+
+# Cookie-consent settings: label languages (comma-separated, default all) and
+# extra accept-button labels / CSS selectors for sites the built-in lists miss
+CONSENT_LANGUAGES = [l.strip() for l in os.getenv("CONSENT_LANGUAGES", "").split(",") if l.strip()]
+CONSENT_EXTRA_LABELS = [l.strip() for l in os.getenv("CONSENT_EXTRA_LABELS", "").split(",") if l.strip()]
+CONSENT_EXTRA_SELECTORS = [l.strip() for l in os.getenv("CONSENT_EXTRA_SELECTORS", "").split(",") if l.strip()]
+
+# Seconds from the shutdown signal that requests and jobs get to finish before they are cancelled
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", 30))
+
+# Search endpoint; only pointed elsewhere (e.g. benchmarks/fixture_sites.py) for offline runs
+GOOGLE_SEARCH_URL = os.getenv("GOOGLE_SEARCH_URL", "https://www.google.com/search")
+
+# HTTP fast path for result pages (see fetch_mode)
+HTTP_FETCH_TIMEOUT = float(os.getenv("HTTP_FETCH_TIMEOUT", 10))
+HTTP_FETCH_MAX_CONNECTIONS = int(os.getenv("HTTP_FETCH_MAX_CONNECTIONS", 50))
+
+# Responses of at least this many bytes are gzip/brotli-compressed for clients that accept it (0 disables)
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+
+# Seconds the /health readiness probe waits for Steel
+HEALTH_TIMEOUT = float(os.getenv("HEALTH_TIMEOUT", 5))
+
+# Logging settings (LOG_FORMAT=text for human-readable lines)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+
+configure_logging(LOG_LEVEL, LOG_FORMAT)
+
+# Shared non-blocking client for the Steel sessions API, balanced over STEEL_URLS
+steel_client = SteelBalancer(
+    STEEL_URLS,
+    strategy=STEEL_BALANCE_STRATEGY,
+    failure_threshold=STEEL_FAILURE_THRESHOLD,
+    reset_timeout=STEEL_CIRCUIT_RESET
+)
+
+session_pool = SteelSessionPool(
+    steel_client.steel_url,
+    size=STEEL_POOL_SIZE,
+    max_uses=STEEL_POOL_MAX_USES,
+    max_idle=STEEL_POOL_MAX_IDLE,
+    client=steel_client,
+    max_overflow=STEEL_POOL_MAX_OVERFLOW
+) if STEEL_POOL_SIZE > 0 else None
+
+
+result_cache = ResultCache(
+    serp_ttl=CACHE_SERP_TTL,
+    page_ttl=CACHE_PAGE_TTL,
+    max_entries=CACHE_MAX_ENTRIES,
+    path=CACHE_PATH,
+    seen_ttl=CACHE_SEEN_TTL,
+    seen_max_entries=CACHE_SEEN_MAX_ENTRIES
+) if CACHE_MAX_ENTRIES > 0 else None
+
+
+# Shared keep-alive client for the HTTP fast path
+http_fetcher = HttpFetcher(timeout=HTTP_FETCH_TIMEOUT, max_connections=HTTP_FETCH_MAX_CONNECTIONS)
+
+# Shared so per-domain consent memory outlives single requests
+consent_handler = ConsentHandler(
+    languages=CONSENT_LANGUAGES or None,
+    extra_labels=CONSENT_EXTRA_LABELS,
+    extra_selectors=CONSENT_EXTRA_SELECTORS
+)
+
+
+# App-scoped: one scraper (and, once started, one Playwright driver) serves every request
+scraper = SteelBrowserScraper(
+    STEEL_URLS,
+    pool=session_pool,
+    client=steel_client,
+    cache=result_cache,
+    consent=consent_handler,
+    fetcher=http_fetcher,
+    search_url=GOOGLE_SEARCH_URL
+)
+
+# Shared by every scraping endpoint so a burst can't open unbounded Steel sessions
+admission = AdmissionController(
+    max_in_flight=ADMISSION_MAX_IN_FLIGHT,
+    max_queued=ADMISSION_MAX_QUEUED,
+    queue_timeout=ADMISSION_QUEUE_TIMEOUT
+)
+rate_limiter = RateLimiter(
+    per_minute=RATE_LIMIT_PER_MINUTE,
+    burst=RATE_LIMIT_BURST,
+    key_limits=RATE_LIMIT_KEYS
+)
+
+
+async def run_search_job(payload, on_event):
+    """Unit of work for /jobs: one /search request streaming into the job record"""
+    request = SearchRequest(**payload)
+    report = {}
+    # Jobs are already bounded by JOBS_CONCURRENCY: they wait for a slot without a deadline
+    async with admission.slot('bulk', bounded=False):
+        await scraper.search_and_extract(
+            **scraper_kwargs(request), report=report, on_event=on_event, collect=False
+        )
+    return report
+
+
+job_queue = JobQueue(
+    run_search_job,
+    store=SQLiteJobStore(JOBS_DB_PATH) if JOBS_DB_PATH else MemoryJobStore(),
+    concurrency=JOBS_CONCURRENCY,
+    max_queued=JOBS_MAX_QUEUED,
+    save_interval=JOBS_SAVE_INTERVAL
+)
+
+
+# monotonic time shutdown began; the drain budget counts from there
+shutdown_started = None
+
+
+def begin_shutdown():
+    """Refuse new scrapes and jobs and start no queued jobs; running ones carry on"""
+    global shutdown_started
+    if shutdown_started is not None:
+        return
+    shutdown_started = time.monotonic()
+    job_queue.stop_intake()
+    admission.close()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start the shared Playwright driver and warm up the session pool
+
+    On shutdown (see begin_shutdown) running scrapes and jobs get what is
+    left of SHUTDOWN_DRAIN_TIMEOUT since the signal to finish, then are
+    cancelled, and every session is released before the driver stops.
+    """
+    await scraper.start()
+    if session_pool:
+        await session_pool.start(playwright=scraper.playwright)
+    await job_queue.start()
+    yield
+    # Already called on the signal under `python main.py`; plain uvicorn gets here first
+    begin_shutdown()
+    drain_timeout = max(0.0, SHUTDOWN_DRAIN_TIMEOUT - (time.monotonic() - shutdown_started))
+    await asyncio.gather(
+        job_queue.close(drain_timeout=drain_timeout),
+        scraper.drain(drain_timeout)
+    )
+    if session_pool:
+        await session_pool.close()
+    await scraper.close()
+    await steel_client.close()
+    await http_fetcher.close()
+    if result_cache:
+        result_cache.close()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Steel Browser API",
     description="Advanced web scraping API with Google search and deep content extraction",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -26,10 +248,33 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
 
-# Get Steel Browser URL from environment variable
-STEEL_URL = os.getenv("STEEL_URL", "https://steel-browser-production-9a2a.up.railway.app")
+if COMPRESSION_MIN_SIZE > 0:
+    app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+
+
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """Tag every log line of a request with its id and echo it back"""
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex[:12]
+    token = request_id_var.set(request_id)
+    IN_FLIGHT.inc()
+    try:
+        response = await call_next(request)
+    finally:
+        IN_FLIGHT.dec()
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    """429 for rate-limited clients, 503 when the server is saturated; both with Retry-After"""
+    return JSONResponse(status_code=exc.status_code, content={"detail": str(exc)},
+                        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))})
 
 
 # Request/Response Models
@@ -43,7 +288,59 @@ class SearchRequest(BaseModel):
         description="Time filter: hour, day, 3days, week, month, year",
         example="3days"
     )
-    num_results: int = Field(default=5, ge=1, le=20, description="Number of results to scrape", example=5)
+    num_results: int = Field(default=5, ge=1, le=50, description="Number of results to scrape (beyond ~8, extra Google pages are loaded in parallel)", example=5)
+    concurrency: int = Field(
+        default=1, ge=1, le=10,
+        description="Result pages scraped in parallel tabs (1 = one after another)",
+        example=4
+    )
+    per_host_concurrency: int = Field(
+        default=2, ge=1, le=10,
+        description="Maximum parallel tabs on the same host",
+        example=2
+    )
+    wait_until: str = Field(
+        default="stable",
+        description="Page readiness: domcontentloaded, load, networkidle or stable (text stops changing)",
+        example="stable"
+    )
+    page_timeout: float = Field(
+        default=30, gt=0, le=180,
+        description="Seconds allowed per result page before it is cut off and reported in error",
+        example=30
+    )
+    request_timeout: float = Field(
+        default=240, gt=0, le=900,
+        description="Seconds allowed for the whole request",
+        example=240
+    )
+    block: List[str] = Field(
+        default_factory=list,
+        description="Request categories to abort: image, font, media, stylesheet, ads, analytics, social",
+        example=["image", "font", "media", "analytics"]
+    )
+    cache: str = Field(
+        default="prefer",
+        description="Result cache usage: prefer (serve fresh cached data), bypass (always scrape) or only (cached data only)",
+        example="prefer"
+    )
+    fetch_mode: str = Field(
+        default="auto",
+        description="Result page fetching: auto (plain HTTP, browser only for JS-rendered or blocked pages), "
+                    "browser (always a browser tab) or http (never a browser)",
+        example="auto"
+    )
+    incremental: bool = Field(
+        default=False,
+        description="Re-check every result page (conditional GET where possible) and mark each "
+                    "result new, changed or unchanged since the last incremental search",
+        example=False
+    )
+    changes_only: bool = Field(
+        default=False,
+        description="With incremental, leave unchanged results out of the response",
+        example=False
+    )
 
     class Config:
         schema_extra = {
@@ -53,7 +350,12 @@ class SearchRequest(BaseModel):
                 "region": "it",
                 "search_type": "news",
                 "time_filter": "3days",
-                "num_results": 5
+                "num_results": 5,
+                "concurrency": 4,
+                "per_host_concurrency": 2,
+                "wait_until": "stable",
+                "page_timeout": 30,
+                "block": ["image", "font", "media", "ads", "analytics"]
             }
         }
 
@@ -65,9 +367,14 @@ class ScrapedResult(BaseModel):
     page_title: str
     headings: List[str]
     paragraphs: List[str]
+    # Only with ?paragraphs=offsets: [start, end] in main_text per paragraph, None for those left in paragraphs
+    paragraph_offsets: Optional[List[Optional[List[int]]]] = None
     main_text: str
     metadata: Dict[str, Any]
     error: Optional[str]
+    fetched_via: Optional[str] = None
+    cache: Optional[str] = None
+    change: Optional[str] = None
     scraped_at: str
 
 
@@ -80,14 +387,202 @@ class SearchResponse(BaseModel):
     scraped_at: str
     total_results: int
     results: List[ScrapedResult]
+    blocking: Optional[Dict[str, Any]] = None
+    cache: Optional[Dict[str, Any]] = None
+    fetch: Optional[Dict[str, Any]] = None
+    changes: Optional[Dict[str, Any]] = None
+    timings: Optional[Dict[str, Any]] = None
+
+
+class BatchSearchRequest(BaseModel):
+    searches: List[SearchRequest] = Field(..., min_length=1, max_length=50, description="Searches to run")
+    max_sessions: int = Field(default=2, ge=1, le=10, description="Browser sessions shared by the whole batch")
+    tabs_per_session: int = Field(default=3, ge=1, le=10, description="Parallel tabs per shared session")
+    per_host_concurrency: int = Field(default=2, ge=1, le=10, description="Maximum parallel tabs on the same host")
+
+
+class BatchQueryResult(BaseModel):
+    query: str
+    language: str
+    region: str
+    search_type: str
+    time_filter: Optional[str]
+    total_results: int
+    results: List[ScrapedResult]
+    error: Optional[str]
+    duration_ms: int
+    blocking: Optional[Dict[str, Any]] = None
+    fetch: Optional[Dict[str, Any]] = None
+    changes: Optional[Dict[str, Any]] = None
+    timings: Optional[Dict[str, Any]] = None
+
+
+class BatchSearchResponse(BaseModel):
+    scraped_at: str
+    total_queries: int
+    results: List[BatchQueryResult]
+    stats: Dict[str, Any]
+    timing: Dict[str, Any]
+
+
+class JobProgress(BaseModel):
+    completed: int
+    total: Optional[int]
+
+
+class JobResponse(BaseModel):
+    id: str
+    status: str
+    created_at: str
+    started_at: Optional[str]
+    finished_at: Optional[str]
+    progress: JobProgress
+    request: Dict[str, Any]
+    results: List[ScrapedResult]
+    error: Optional[str]
+    blocking: Optional[Dict[str, Any]] = None
+    cache: Optional[Dict[str, Any]] = None
+    fetch: Optional[Dict[str, Any]] = None
+    changes: Optional[Dict[str, Any]] = None
+    timings: Optional[Dict[str, Any]] = None
 
 
 class HealthResponse(BaseModel):
     status: str
     steel_url: str
+    steel: Dict[str, Any]
+    pool: Optional[Dict[str, Any]] = None
+    timestamp: str
+
+
+class PoolStatsResponse(BaseModel):
+    enabled: bool
+    stats: Dict[str, Any]
+    timestamp: str
+
+
+class BackendStatsResponse(BaseModel):
+    stats: Dict[str, Any]
+    timestamp: str
+
+
+class CacheStatsResponse(BaseModel):
+    enabled: bool
+    stats: Dict[str, Any]
+    timestamp: str
+
+
+class AdmissionStatsResponse(BaseModel):
+    admission: Dict[str, Any]
+    rate_limits: Dict[str, Any]
     timestamp: str
 
 
+def validate_search_request(request: SearchRequest):
+    """Reject invalid search options with a 400"""
+    if request.search_type not in ['web', 'news']:
+        raise HTTPException(status_code=400, detail="search_type must be 'web' or 'news'")
+    
+    valid_time_filters = ['hour', 'day', '3days', 'week', 'month', 'year', None]
+    if request.time_filter not in valid_time_filters:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"time_filter must be one of: {', '.join([str(f) for f in valid_time_filters if f])}"
+        )
+    
+    if request.wait_until not in WAIT_STRATEGIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"wait_until must be one of: {', '.join(WAIT_STRATEGIES)}"
+        )
+    
+    invalid_block = [c for c in request.block if c not in BLOCK_CATEGORIES]
+    if invalid_block:
+        raise HTTPException(
+            status_code=400,
+            detail=f"block entries must be among: {', '.join(BLOCK_CATEGORIES)}"
+        )
+    
+    if request.cache not in CACHE_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"cache must be one of: {', '.join(CACHE_MODES)}"
+        )
+    
+    if request.fetch_mode not in FETCH_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"fetch_mode must be one of: {', '.join(FETCH_MODES)}"
+        )
+    
+    if request.incremental and result_cache is None:
+        raise HTTPException(status_code=400, detail="incremental needs the result cache (CACHE_MAX_ENTRIES > 0)")
+    
+    if request.changes_only and not request.incremental:
+        raise HTTPException(status_code=400, detail="changes_only needs incremental")
+
+
+def result_encoding(fields: Optional[str], paragraphs: str):
+    """Validated `fields` and `paragraphs` query parameters as encode_result arguments"""
+    try:
+        fields = parse_fields(fields, list(ScrapedResult.model_fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if paragraphs not in PARAGRAPH_FORMATS:
+        raise HTTPException(status_code=400, detail=f"paragraphs must be one of: {', '.join(PARAGRAPH_FORMATS)}")
+    if paragraphs == 'offsets' and fields is not None and 'main_text' not in fields:
+        raise HTTPException(status_code=400, detail="paragraphs=offsets needs main_text among the fields")
+    return {'fields': fields, 'paragraphs': paragraphs}
+
+
+def scraper_kwargs(request: SearchRequest):
+    """Map a SearchRequest onto SteelBrowserScraper.search_and_extract arguments"""
+    return dict(
+        query=request.query,
+        language=request.language,
+        region=request.region,
+        search_type=request.search_type,
+        time_filter=request.time_filter,
+        num_results=request.num_results,
+        concurrency=request.concurrency,
+        per_host_concurrency=request.per_host_concurrency,
+        wait_until=request.wait_until,
+        page_timeout=request.page_timeout,
+        request_timeout=request.request_timeout,
+        block=request.block,
+        cache_mode=request.cache,
+        fetch_mode=request.fetch_mode,
+        incremental=request.incremental,
+        changes_only=request.changes_only
+    )
+
+
+def client_key(http_request: Request):
+    """Rate-limit identity: the X-API-Key header, else the client address"""
+    key = http_request.headers.get("X-API-Key")
+    if key:
+        return key
+    return http_request.client.host if http_request.client else "unknown"
+
+
+def request_priority(http_request: Request, endpoint_priority: str):
+    """The endpoint's priority class, or a lower one asked for in the X-Priority header"""
+    priority = http_request.headers.get("X-Priority", endpoint_priority)
+    if priority not in PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"X-Priority must be one of: {', '.join(PRIORITIES)}")
+    # PRIORITIES runs highest first; a client can step down but never up
+    return max(priority, endpoint_priority, key=PRIORITIES.index)
+
+
+@asynccontextmanager
+async def admitted(http_request: Request, endpoint_priority: str, cost=1, weight=1):
+    """Charge the caller's rate limit, then hold `weight` admission slots"""
+    priority = request_priority(http_request, endpoint_priority)
+    rate_limiter.check(client_key(http_request), cost)
+    async with admission.slot(priority, weight):
+        yield
+
+
 # API Endpoints
 
 @app.get("/", tags=["Root"])
@@ -99,24 +594,100 @@ async def root():
         "description": "Advanced web scraping API with Steel Browser",
         "endpoints": {
             "health": "/health",
+            "metrics": "/metrics",
             "search": "/search (POST)",
+            "search_stream": "/search/stream (POST)",
+            "search_batch": "/search/batch (POST)",
+            "jobs": "/jobs (POST), /jobs/{id}, /jobs/{id}/cancel (POST)",
+            "pool": "/pool",
+            "backends": "/backends",
+            "cache": "/cache",
+            "admission": "/admission",
             "docs": "/docs"
         }
     }
 
 
-@app.get("/health", response_model=HealthResponse, tags=["Health"])
+@app.get("/health", response_model=HealthResponse, tags=["Health"],
+         responses={503: {"model": HealthResponse, "description": "Steel Browser is unreachable"}})
 async def health_check():
-    """Health check endpoint"""
-    return HealthResponse(
-        status="healthy",
-        steel_url=STEEL_URL,
+    """
+    Readiness probe: checks that Steel Browser answers within HEALTH_TIMEOUT
+    
+    Returns 200 with status "healthy" when at least one Steel backend answers,
+    or 503 with status "unhealthy" and the probe errors so load balancers stop
+    routing to a replica that cannot scrape. Per-backend results are under
+    `steel.backends`.
+    """
+    steel = await steel_client.probe(timeout=HEALTH_TIMEOUT)
+    health = HealthResponse(
+        status="healthy" if steel['reachable'] else "unhealthy",
+        steel_url=steel_client.steel_url,
+        steel=steel,
+        pool=session_pool.stats() if session_pool else None,
+        timestamp=datetime.now().isoformat()
+    )
+    if not steel['reachable']:
+        return JSONResponse(status_code=503, content=health.model_dump())
+    return health
+
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Health"])
+async def metrics():
+    """Prometheus metrics: search and stage latency, page outcomes by domain, sessions in use"""
+    if session_pool:
+        pool_stats = session_pool.stats()
+        POOL_SESSIONS.set(pool_stats['idle'], state='idle')
+        POOL_SESSIONS.set(pool_stats['leased'], state='leased')
+    for backend in steel_client.stats()['backends']:
+        BACKEND_SESSIONS.set(backend['active_sessions'], backend=backend['url'])
+        BACKEND_UP.set(0 if backend['state'] == 'open' else 1, backend=backend['url'])
+    MEMORY.set(resident_memory_bytes())
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/pool", response_model=PoolStatsResponse, tags=["Health"])
+async def pool_stats():
+    """Warm session pool statistics"""
+    return PoolStatsResponse(
+        enabled=session_pool is not None,
+        stats=session_pool.stats() if session_pool else {},
+        timestamp=datetime.now().isoformat()
+    )
+
+
+@app.get("/backends", response_model=BackendStatsResponse, tags=["Health"])
+async def backend_stats():
+    """Steel backends: open sessions, creation latency, failures and circuit state"""
+    return BackendStatsResponse(
+        stats=steel_client.stats(),
+        timestamp=datetime.now().isoformat()
+    )
+
+
+@app.get("/cache", response_model=CacheStatsResponse, tags=["Health"])
+async def cache_stats():
+    """Result cache statistics per tier"""
+    return CacheStatsResponse(
+        enabled=result_cache is not None,
+        stats=result_cache.stats() if result_cache else {},
+        timestamp=datetime.now().isoformat()
+    )
+
+
+@app.get("/admission", response_model=AdmissionStatsResponse, tags=["Health"])
+async def admission_stats():
+    """Admission slots in use, queued requests per priority, rejections and rate-limit counters"""
+    return AdmissionStatsResponse(
+        admission=admission.stats(),
+        rate_limits=rate_limiter.stats(),
         timestamp=datetime.now().isoformat()
     )
 
 
 @app.post("/search", response_model=SearchResponse, tags=["Search"])
-async def search_and_scrape(request: SearchRequest):
+async def search_and_scrape(request: SearchRequest, http_request: Request,
+                            fields: Optional[str] = None, paragraphs: str = "text"):
     """
     Perform advanced Google search and deep scrape each result
     
@@ -132,55 +703,262 @@ async def search_and_scrape(request: SearchRequest):
     - **region**: Geographic region for results (it, us, uk, de, fr, etc.)
     - **search_type**: Type of search - "web" for regular search, "news" for news search
     - **time_filter**: Optional time filter (hour, day, 3days, week, month, year)
-    - **num_results**: Number of results to scrape (1-20, default: 5)
+    - **num_results**: Number of results to scrape (1-50, default: 5)
+    - **concurrency**: Result pages scraped in parallel tabs (1-10, default: 1)
+    - **per_host_concurrency**: Maximum parallel tabs per host (1-10, default: 2)
+    - **wait_until**: Page readiness strategy - domcontentloaded, load, networkidle or stable (default)
+    - **page_timeout**: Seconds per result page before it is cut off (default: 30)
+    - **request_timeout**: Seconds for the whole request (default: 240)
+    - **block**: Request categories to abort (image, font, media, stylesheet, ads, analytics, social)
+    - **cache**: Result cache usage - prefer (default), bypass or only
+    - **fetch_mode**: Result page fetching - auto (default, HTTP first), browser or http
+    - **incremental**: Mark results new, changed or unchanged since the last incremental search
+    - **changes_only**: With incremental, return only new and changed results
+    - **fields** (query): Comma-separated result fields to return, e.g. `url,page_title,main_text` (default: all)
+    - **paragraphs** (query): `text` (default) or `offsets` ([start, end] into main_text instead of copies)
     
     Returns:
     - Complete scraped data including titles, full text, headings, paragraphs, and metadata
     """
+    validate_search_request(request)
+    encoding = result_encoding(fields, paragraphs)
+    
     try:
-        # Validate inputs
-        if request.search_type not in ['web', 'news']:
-            raise HTTPException(status_code=400, detail="search_type must be 'web' or 'news'")
-        
-        valid_time_filters = ['hour', 'day', '3days', 'week', 'month', 'year', None]
-        if request.time_filter not in valid_time_filters:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"time_filter must be one of: {', '.join([str(f) for f in valid_time_filters if f])}"
-            )
-        
-        # Initialize scraper
-        scraper = SteelBrowserScraper(STEEL_URL)
-        
         # Perform search and scraping
-        results = await scraper.search_and_extract(
-            query=request.query,
-            language=request.language,
-            region=request.region,
-            search_type=request.search_type,
-            time_filter=request.time_filter,
-            num_results=request.num_results
-        )
+        report = {}
+        async with admitted(http_request, 'interactive'):
+            results = await scraper.search_and_extract(**scraper_kwargs(request), report=report)
         
-        # Build response
-        return SearchResponse(
-            query=request.query,
-            language=request.language,
-            region=request.region,
-            search_type=request.search_type,
-            time_filter=request.time_filter,
-            scraped_at=datetime.now().isoformat(),
-            total_results=len(results),
-            results=[ScrapedResult(**result) for result in results]
-        )
+        # Build response. Results come out of the scraper in the ScrapedResult shape
+        # (minus projected-out fields), so they are serialized as they are: the
+        # response models only document the schema and are not validated again
+        return JSONResponse({
+            'query': request.query,
+            'language': request.language,
+            'region': request.region,
+            'search_type': request.search_type,
+            'time_filter': request.time_filter,
+            'scraped_at': datetime.now().isoformat(),
+            'total_results': len(results),
+            'results': [encode_result(result, **encoding) for result in results],
+            'blocking': report.get('blocking'),
+            'cache': report.get('cache'),
+            'fetch': report.get('fetch'),
+            'changes': report.get('changes'),
+            'timings': report.get('timings'),
+        })
         
+    except (AdmissionRejected, HTTPException):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Scraping failed: {str(e)}")
 
 
+@app.post("/search/stream", tags=["Search"])
+async def search_and_scrape_stream(request: SearchRequest, http_request: Request, format: str = "ndjson",
+                                   fields: Optional[str] = None, paragraphs: str = "text"):
+    """
+    Same search as /search, streamed while it runs
+    
+    Emits one JSON record per event instead of a single buffered response:
+    1. `serp`: the result links found on Google
+    2. `result`: one record per scraped page, as soon as it completes (completion order, see `position`)
+    3. `summary`: totals plus blocking/cache stats - or `error` if the search failed
+    
+    Parameters:
+    - Same body as /search
+    - **format** (query): `ndjson` (default, one JSON object per line) or `sse` (Server-Sent Events)
+    - **fields**, **paragraphs** (query): Result projection, as for /search
+    """
+    validate_search_request(request)
+    if format not in ['ndjson', 'sse']:
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+    encoding = result_encoding(fields, paragraphs)
+    
+    priority = request_priority(http_request, 'interactive')
+    rate_limiter.check(client_key(http_request))
+    weight = await admission.acquire(priority)
+    released = False
+    
+    def release():
+        # Runs when the stream ends and again as the response's background task,
+        # which also covers clients that disconnect before the stream starts
+        nonlocal released
+        if not released:
+            released = True
+            admission.release(weight)
+    
+    async def admitted_events():
+        try:
+            async for event in scraper.iter_search_and_extract(**scraper_kwargs(request)):
+                if event['type'] == 'result':
+                    event = {**event, 'result': encode_result(event['result'], **encoding)}
+                yield event
+        finally:
+            release()
+    
+    events = admitted_events()
+    
+    async def ndjson_stream():
+        async for event in events:
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+    
+    async def sse_stream():
+        async for event in events:
+            yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+    
+    if format == 'sse':
+        return StreamingResponse(sse_stream(), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+                                 background=BackgroundTask(release))
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson",
+                             headers={"X-Accel-Buffering": "no"}, background=BackgroundTask(release))
+
+
+@app.post("/search/batch", response_model=BatchSearchResponse, tags=["Search"])
+async def search_and_scrape_batch(request: BatchSearchRequest, http_request: Request,
+                                  fields: Optional[str] = None, paragraphs: str = "text"):
+    """
+    Run many searches over a shared set of browser sessions
+    
+    Instead of one Steel session per search, the whole batch shares
+    `max_sessions` sessions with `tabs_per_session` tabs each. Result URLs
+    that appear in several searches are scraped only once.
+    
+    Parameters:
+    - **searches**: List of /search request bodies (1-50). Their `concurrency` and
+      `per_host_concurrency` are replaced by the batch-level settings below
+    - **max_sessions**: Shared browser sessions (1-10, default: 2)
+    - **tabs_per_session**: Parallel tabs per session (1-10, default: 3)
+    - **per_host_concurrency**: Maximum parallel tabs per host across the batch (1-10, default: 2)
+    - **fields**, **paragraphs** (query): Result projection, as for /search
+    
+    Returns:
+    - Per-search results (a failed search has `error` set), plus batch stats and timing
+    """
+    for search in request.searches:
+        validate_search_request(search)
+    encoding = result_encoding(fields, paragraphs)
+    
+    try:
+        report = {}
+        # One rate-limit token per search, one admission slot per shared session
+        async with admitted(http_request, 'bulk', cost=len(request.searches), weight=request.max_sessions):
+            outcomes = await scraper.batch_search_and_extract(
+                [scraper_kwargs(search) for search in request.searches],
+                max_sessions=request.max_sessions,
+                tabs_per_session=request.tabs_per_session,
+                per_host_concurrency=request.per_host_concurrency,
+                report=report
+            )
+        
+        # Serialized as built, like /search
+        return JSONResponse({
+            'scraped_at': datetime.now().isoformat(),
+            'total_queries': len(outcomes),
+            'results': [
+                {
+                    'query': search.query,
+                    'language': search.language,
+                    'region': search.region,
+                    'search_type': search.search_type,
+                    'time_filter': search.time_filter,
+                    'total_results': len(outcome['results']),
+                    'results': [encode_result(result, **encoding) for result in outcome['results']],
+                    'error': outcome['error'],
+                    'duration_ms': outcome['duration_ms'],
+                    'blocking': outcome['report'].get('blocking'),
+                    'fetch': outcome['report'].get('fetch'),
+                    'changes': outcome['report'].get('changes'),
+                    'timings': outcome['report'].get('timings'),
+                }
+                for search, outcome in zip(request.searches, outcomes)
+            ],
+            'stats': report['stats'],
+            'timing': report['timing'],
+        })
+        
+    except (AdmissionRejected, HTTPException):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch scraping failed: {str(e)}")
+
+
+def job_response(job, encoding, status_code=200):
+    """A job record in the JobResponse shape, serialized as built like /search"""
+    return JSONResponse(status_code=status_code, content={
+        'id': job['id'],
+        'status': job['status'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at'],
+        'progress': job['progress'],
+        'request': job['request'],
+        'results': [encode_result(result, **encoding) for result in job['results']],
+        'error': job['error'],
+        'blocking': job['report'].get('blocking'),
+        'cache': job['report'].get('cache'),
+        'fetch': job['report'].get('fetch'),
+        'changes': job['report'].get('changes'),
+        'timings': job['report'].get('timings'),
+    })
+
+
+@app.post("/jobs", response_model=JobResponse, status_code=202, tags=["Jobs"])
+async def submit_job(request: SearchRequest, http_request: Request,
+                     fields: Optional[str] = None, paragraphs: str = "text"):
+    """
+    Queue a /search request and return immediately
+    
+    Takes the same body as /search. Poll `GET /jobs/{id}` for status,
+    progress and partial results. Returns 429 when the queue is full or
+    the client is over its rate limit. Jobs run at bulk priority.
+    `fields` and `paragraphs` shape the results as for /search.
+    """
+    validate_search_request(request)
+    encoding = result_encoding(fields, paragraphs)
+    rate_limiter.check(client_key(http_request))
+    try:
+        job = await job_queue.submit(request.model_dump())
+    except QueueFull as e:
+        return JSONResponse(status_code=429, content={"detail": str(e)}, headers={"Retry-After": "30"})
+    except QueueClosed as e:
+        return JSONResponse(status_code=503, content={"detail": str(e)}, headers={"Retry-After": "30"})
+    return job_response(job, encoding, status_code=202)
+
+
+@app.get("/jobs/{job_id}", response_model=JobResponse, tags=["Jobs"])
+async def get_job(job_id: str, fields: Optional[str] = None, paragraphs: str = "text"):
+    """Job status (queued, running, completed, failed, cancelled), progress and results so far"""
+    encoding = result_encoding(fields, paragraphs)
+    try:
+        return job_response(await job_queue.get(job_id), encoding)
+    except JobNotFound:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+
+@app.post("/jobs/{job_id}/cancel", response_model=JobResponse, tags=["Jobs"])
+async def cancel_job(job_id: str, fields: Optional[str] = None, paragraphs: str = "text"):
+    """Cancel a queued or running job; results scraped so far are kept"""
+    encoding = result_encoding(fields, paragraphs)
+    try:
+        return job_response(await job_queue.cancel(job_id), encoding)
+    except JobNotFound:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+
 # For local development
 if __name__ == "__main__":
     import uvicorn
+
+    class Server(uvicorn.Server):
+        """Stops job and request intake on the signal, not after uvicorn's graceful wait"""
+
+        def handle_exit(self, sig, frame):
+            begin_shutdown()
+            super().handle_exit(sig, frame)
+
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    Server(uvicorn.Config(app, host="0.0.0.0", port=port,
+                          timeout_graceful_shutdown=SHUTDOWN_DRAIN_TIMEOUT)).run()
 
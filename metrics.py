@@ -0,0 +1,225 @@
+"""
+Metrics Module
+In-process counters, gauges and histograms rendered in Prometheus text format
+"""
+
+import os
+import sys
+import time
+from urllib.parse import urlparse
+
+
+# Latency buckets in seconds, from a warm pool lease up to a slow full search
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Distinct domains tracked before new ones are folded into "other"
+MAX_DOMAINS = 500
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values)) + list(extra or [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(round(float(value), 6))
+
+
+class Metric:
+    """A named metric with one time series per combination of label values"""
+
+    type = 'untyped'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        if not self.labelnames:
+            # Unlabelled metrics are exported from the start, not on first use
+            self._series[()] = self._empty()
+
+    def _empty(self):
+        return 0
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {', '.join(self.labelnames) or 'none'}")
+        return tuple(labels[name] for name in self.labelnames)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+        for key, value in sorted(self._series.items()):
+            lines.extend(self._render_series(key, value))
+        return lines
+
+    def _render_series(self, key, value):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}']
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self._series[key] = self._series.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        self._series[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self._series[key] = self._series.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        super().__init__(name, help, labelnames)
+
+    def _empty(self):
+        return {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = self._empty()
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series['buckets'][i] += 1
+                break
+        series['sum'] += value
+        series['count'] += 1
+
+    def _render_series(self, key, series):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, series['buckets']):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f'{self.name}_sum{labels} {_format_value(series["sum"])}')
+        lines.append(f'{self.name}_count{labels} {series["count"]}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+SEARCHES = REGISTRY.register(Counter(
+    'steel_searches_total', 'Searches finished, by outcome', ['outcome']))
+SEARCH_SECONDS = REGISTRY.register(Histogram(
+    'steel_search_duration_seconds', 'Wall time of a whole search'))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'steel_stage_duration_seconds', 'Time spent per scraping stage (see tracing spans)', ['stage']))
+PAGES = REGISTRY.register(Counter(
+    'steel_pages_total', 'Result pages scraped, by domain, outcome (success, timeout, error) '
+    'and fetch path (http, browser)', ['domain', 'outcome', 'via']))
+PAGE_SECONDS = REGISTRY.register(Counter(
+    'steel_page_seconds_total', 'Seconds spent scraping pages, by domain', ['domain']))
+TEXT_BYTES = REGISTRY.register(Counter(
+    'steel_extracted_text_bytes_total', 'UTF-8 bytes of main text extracted'))
+PAGE_CHANGES = REGISTRY.register(Counter(
+    'steel_page_changes_total', 'Pages checked by incremental searches, by change (new, changed, unchanged)',
+    ['change']))
+IN_FLIGHT = REGISTRY.register(Gauge(
+    'steel_http_requests_in_flight', 'HTTP requests currently being served'))
+SESSIONS_ACTIVE = REGISTRY.register(Gauge(
+    'steel_sessions_active', 'Browser sessions currently in use by a search'))
+POOL_SESSIONS = REGISTRY.register(Gauge(
+    'steel_pool_sessions', 'Warm pool sessions, by state', ['state']))
+BACKEND_SESSIONS = REGISTRY.register(Gauge(
+    'steel_backend_sessions', 'Open sessions per Steel backend', ['backend']))
+BACKEND_UP = REGISTRY.register(Gauge(
+    'steel_backend_up', 'Whether a Steel backend takes new sessions (circuit not open)', ['backend']))
+BACKEND_FAILURES = REGISTRY.register(Counter(
+    'steel_backend_failures_total', 'Failed session creations, releases and probes per Steel backend',
+    ['backend']))
+ADMISSION_IN_FLIGHT = REGISTRY.register(Gauge(
+    'steel_admission_in_flight', 'Admission slots in use (a batch holds one per session)'))
+ADMISSION_QUEUED = REGISTRY.register(Gauge(
+    'steel_admission_queued', 'Requests waiting for an admission slot, by priority', ['priority']))
+ADMISSION_WAIT_SECONDS = REGISTRY.register(Histogram(
+    'steel_admission_wait_seconds', 'Time queued requests waited for a slot, by priority', ['priority']))
+ADMISSION_REJECTIONS = REGISTRY.register(Counter(
+    'steel_admission_rejections_total', 'Requests turned away, by reason (queue_full, timeout, displaced, '
+    'rate_limited, shutting_down)', ['reason']))
+MEMORY = REGISTRY.register(Gauge(
+    'process_resident_memory_bytes', 'Resident memory of this process'))
+
+_domains = set()
+
+
+def domain_label(url):
+    """Host of `url` without www., capped at MAX_DOMAINS distinct values"""
+    host = (urlparse(url).hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if host not in _domains:
+        if len(_domains) >= MAX_DOMAINS:
+            return 'other'
+        _domains.add(host)
+    return host
+
+
+def resident_memory_bytes():
+    """Current RSS from /proc; peak RSS where /proc is missing (macOS, BSD)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS, kilobytes elsewhere
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def observe_page(url, outcome, seconds, text='', via='browser'):
+    domain = domain_label(url)
+    PAGES.inc(domain=domain, outcome=outcome, via=via)
+    PAGE_SECONDS.inc(seconds, domain=domain)
+    if text:
+        TEXT_BYTES.inc(len(text.encode('utf-8')))
+
+
+def observe_search(trace, outcome):
+    """Record a finished search and every stage span on its trace"""
+    SEARCHES.inc(outcome=outcome)
+    SEARCH_SECONDS.observe(time.monotonic() - trace.started)
+    for entry in trace.spans:
+        STAGE_SECONDS.observe(entry['duration_ms'] / 1000, stage=entry['name'])
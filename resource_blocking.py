@@ -0,0 +1,169 @@
+"""
+Resource Blocking Module
+Request routing that aborts requests the scraper never reads
+"""
+
+from urllib.parse import urlparse
+
+
+# Categories matched on Playwright's request.resource_type
+RESOURCE_CATEGORIES = {
+    'image': {'image'},
+    'font': {'font'},
+    'media': {'media'},
+    'stylesheet': {'stylesheet'},
+}
+
+# Categories matched on the request host (domain or any subdomain)
+DOMAIN_CATEGORIES = {
+    'ads': [
+        'doubleclick.net',
+        'googlesyndication.com',
+        'googleadservices.com',
+        'adservice.google.com',
+        'amazon-adsystem.com',
+        'adnxs.com',
+        'criteo.com',
+        'criteo.net',
+        'taboola.com',
+        'outbrain.com',
+        'pubmatic.com',
+        'rubiconproject.com',
+        'openx.net',
+        'teads.tv',
+        'moatads.com',
+        'casalemedia.com',
+        'smartadserver.com',
+    ],
+    'analytics': [
+        'google-analytics.com',
+        'analytics.google.com',
+        'googletagmanager.com',
+        'hotjar.com',
+        'segment.io',
+        'segment.com',
+        'mixpanel.com',
+        'scorecardresearch.com',
+        'quantserve.com',
+        'chartbeat.com',
+        'chartbeat.net',
+        'nr-data.net',
+        'clarity.ms',
+        'webtrends.com',
+        'omtrdc.net',
+        'demdex.net',
+        'krxd.net',
+    ],
+    'social': [
+        'connect.facebook.net',
+        'platform.twitter.com',
+        'platform.linkedin.com',
+        'widgets.pinterest.com',
+        'addthis.com',
+        'sharethis.com',
+    ],
+}
+
+BLOCK_CATEGORIES = sorted(list(RESOURCE_CATEGORIES) + list(DOMAIN_CATEGORIES))
+
+# Rough median transfer size per blocked request, used to estimate savings
+AVERAGE_BYTES = {
+    'image': 40000,
+    'font': 30000,
+    'media': 300000,
+    'stylesheet': 20000,
+    'ads': 25000,
+    'analytics': 20000,
+    'social': 30000,
+}
+
+
+class ResourceBlocker:
+    """
+    Aborts requests by resource type and domain blocklist.
+
+    Installed on a browser context or a single page with `install()` and
+    removed with `remove()`, so a pooled context goes back to the pool
+    unrouted.
+    """
+
+    def __init__(self, categories):
+        unknown = set(categories) - set(BLOCK_CATEGORIES)
+        if unknown:
+            raise ValueError(f"Unknown block categories: {', '.join(sorted(unknown))}")
+
+        self.categories = sorted(set(categories))
+        self._resource_types = {}
+        for category in self.categories:
+            for resource_type in RESOURCE_CATEGORIES.get(category, ()):
+                self._resource_types[resource_type] = category
+        self._domains = [
+            (domain, category)
+            for category in self.categories
+            for domain in DOMAIN_CATEGORIES.get(category, ())
+        ]
+
+        self.blocked = {category: 0 for category in self.categories}
+        self.allowed = 0
+        self._targets = []
+
+    def category_for(self, url, resource_type):
+        """Category that blocks this request, or None to let it through"""
+        # Domain categories first so an ad image counts as 'ads'
+        if self._domains:
+            host = (urlparse(url).hostname or '').lower()
+            for domain, category in self._domains:
+                if host == domain or host.endswith('.' + domain):
+                    return category
+        return self._resource_types.get(resource_type)
+
+    async def _handle(self, route):
+        request = route.request
+        category = self.category_for(request.url, request.resource_type)
+        try:
+            if category:
+                self.blocked[category] += 1
+                await route.abort('blockedbyclient')
+            else:
+                self.allowed += 1
+                await route.fallback()
+        except Exception:
+            # Page closed while the request was in flight
+            pass
+
+    async def install(self, target):
+        """Route a BrowserContext or Page through the blocker"""
+        if not self.categories:
+            return
+        self._targets.append(target)
+        await target.route('**/*', self._handle)
+
+    def routes(self, target):
+        """Whether `target` (a context or page) is currently routed by this blocker"""
+        return target in self._targets
+
+    async def remove(self, target=None):
+        """Unroute one target, or every target when none is given"""
+        targets = [target] if target is not None else list(self._targets)
+        for t in targets:
+            if t not in self._targets:
+                continue
+            self._targets.remove(t)
+            try:
+                await t.unroute('**/*', self._handle)
+            except Exception:
+                pass
+
+    def stats(self):
+        """Requests blocked per category and estimated bytes saved"""
+        blocked_total = sum(self.blocked.values())
+        return {
+            'categories': self.categories,
+            'requests_blocked': blocked_total,
+            'requests_allowed': self.allowed,
+            'blocked_by_category': dict(self.blocked),
+            'estimated_bytes_saved': sum(
+                count * AVERAGE_BYTES.get(category, 0)
+                for category, count in self.blocked.items()
+            ),
+        }
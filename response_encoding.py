@@ -0,0 +1,169 @@
+"""
+Response Encoding Module
+Field projection, paragraph offsets and gzip/brotli compression for API responses
+"""
+
+import asyncio
+import gzip
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # optional: without it clients asking for br get gzip
+    brotli = None
+
+
+# text: paragraphs as strings; offsets: [start, end] into main_text in paragraph_offsets
+PARAGRAPH_FORMATS = ['text', 'offsets']
+
+# Kept in every projected result so streamed results can still be put back in order
+ALWAYS_INCLUDED = ('position',)
+
+# Streamed line by line: compressing would hold events back until a block fills
+STREAMED_TYPES = ('application/x-ndjson', 'text/event-stream')
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Larger bodies are compressed in a worker thread, off the event loop
+THREAD_MIN_SIZE = 256 * 1024
+
+
+def parse_fields(value, allowed):
+    """Result fields named in a comma-separated `fields` parameter, or None for all"""
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}; choose from: {', '.join(allowed)}")
+    return fields
+
+
+def paragraph_offsets(paragraphs, main_text):
+    """
+    Each paragraph as [start, end] of its first occurrence in `main_text`
+    after the previous one, or None where it is not found there (e.g. cut
+    off by the text length limit); returns the offsets and, in order, the
+    paragraphs left as text.
+    """
+    offsets = []
+    unmatched = []
+    cursor = 0
+    for paragraph in paragraphs:
+        start = main_text.find(paragraph, cursor)
+        if start < 0:
+            start = main_text.find(paragraph)
+        if start < 0:
+            offsets.append(None)
+            unmatched.append(paragraph)
+            continue
+        cursor = start + len(paragraph)
+        offsets.append([start, cursor])
+    return offsets, unmatched
+
+
+def encode_result(result, fields=None, paragraphs='text'):
+    """
+    A scraped result as sent to clients: only `fields`, paragraphs as text or offsets
+
+    With offsets, `paragraph_offsets` has an entry per paragraph and
+    `paragraphs` only the text of those whose entry is None.
+    """
+    if paragraphs == 'offsets' and result.get('paragraphs'):
+        offsets, unmatched = paragraph_offsets(result['paragraphs'], result.get('main_text', ''))
+        result = {**result, 'paragraphs': unmatched, 'paragraph_offsets': offsets}
+    if fields is not None:
+        if 'paragraphs' in fields:
+            fields = [*fields, 'paragraph_offsets']
+        result = {key: value for key, value in result.items() if key in fields or key in ALWAYS_INCLUDED}
+    return result
+
+
+def choose_encoding(accept_encoding):
+    """'br' or 'gzip' by the client's Accept-Encoding q-values (br on a tie), or None"""
+    accepted = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0
+        if name.strip():
+            accepted[name.strip().lower()] = quality
+    wildcard = accepted.get('*', 0)
+    candidates = ['br', 'gzip'] if brotli else ['gzip']
+    best = max(candidates, key=lambda name: accepted.get(name, wildcard))
+    return best if accepted.get(best, wildcard) > 0 else None
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Brotli (when installed) or gzip for responses of at least `minimum_size`
+    bytes, as negotiated with Accept-Encoding.
+
+    The body is compressed in one piece once complete, in a worker thread
+    when large so other requests keep running. NDJSON and SSE streams pass
+    through untouched so every event still arrives at once.
+    """
+
+    def __init__(self, app, minimum_size=1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get('accept-encoding', ''))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+        chunks = []
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if message['type'] == 'http.response.start':
+                headers = Headers(raw=message['headers'])
+                content_type = headers.get('content-type', '').split(';')[0].strip()
+                if 'content-encoding' in headers or content_type in STREAMED_TYPES:
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message
+                return
+            if passthrough or message['type'] != 'http.response.body':
+                await send(message)
+                return
+
+            chunks.append(message.get('body', b''))
+            if message.get('more_body', False):
+                return
+            body = b''.join(chunks)
+            if len(body) >= self.minimum_size:
+                if len(body) >= THREAD_MIN_SIZE:
+                    body = await asyncio.to_thread(compress, body, encoding)
+                else:
+                    body = compress(body, encoding)
+                headers = MutableHeaders(raw=list(start['headers']))
+                headers['Content-Encoding'] = encoding
+                headers['Content-Length'] = str(len(body))
+                headers.add_vary_header('Accept-Encoding')
+                start = {**start, 'headers': headers.raw}
+            await send(start)
+            await send({'type': 'http.response.body', 'body': body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,221 @@
+"""
+Result Cache Module
+Two-tier cache for SERP lookups and extracted page content
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+
+CACHE_MODES = ['prefer', 'bypass', 'only']
+
+# Query parameters that never change the page content
+TRACKING_PARAMS = {'gclid', 'fbclid', 'msclkid', 'mc_cid', 'mc_eid', 'ref', 'ocid'}
+
+
+def normalize_url(url):
+    """Canonical cache key: lowercase host, sorted query, no fragment or tracking params"""
+    parts = urlsplit(url.strip())
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k not in TRACKING_PARAMS and not k.startswith('utm_')
+    )
+    netloc = parts.netloc.lower()
+    if netloc.endswith(':80') and parts.scheme == 'http':
+        netloc = netloc[:-3]
+    elif netloc.endswith(':443') and parts.scheme == 'https':
+        netloc = netloc[:-4]
+    return urlunsplit((parts.scheme.lower(), netloc, parts.path or '/', urlencode(query), ''))
+
+
+def content_hash(text):
+    """Fingerprint of extracted text, insensitive to whitespace changes"""
+    return hashlib.sha256(' '.join(text.split()).encode('utf-8')).hexdigest()
+
+
+class MemoryTier:
+    """In-process LRU with per-entry expiry"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value, expires_at
+
+    def set(self, key, value, expires_at):
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteTier:
+    """On-disk store shared by all tiers, so entries survive restarts"""
+
+    PRUNE_EVERY = 200
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            ' tier TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,'
+            ' expires_at REAL NOT NULL, PRIMARY KEY (tier, key))'
+        )
+        self._db.commit()
+
+    def get(self, tier, key):
+        with self._lock:
+            row = self._db.execute(
+                'SELECT value, expires_at FROM cache WHERE tier = ? AND key = ? AND expires_at > ?',
+                (tier, key, time.time())
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, tier, key, value, expires_at):
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO cache (tier, key, value, expires_at) VALUES (?, ?, ?, ?)',
+                (tier, key, json.dumps(value), expires_at)
+            )
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                self._db.execute('DELETE FROM cache WHERE expires_at <= ?', (time.time(),))
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._db.execute('DELETE FROM cache')
+            self._db.commit()
+
+    def count(self, tier):
+        with self._lock:
+            return self._db.execute(
+                'SELECT COUNT(*) FROM cache WHERE tier = ? AND expires_at > ?', (tier, time.time())
+            ).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class ResultCache:
+    """
+    SERP tier keyed on the normalized Google URL and page tier keyed on the
+    normalized result URL, each with its own TTL. Lookups hit the in-process
+    LRU first and fall back to SQLite when a `path` is configured.
+
+    The seen tier keeps, per result URL, the last page scraped by an
+    incremental search and its content hash, for much longer than the page
+    tier: it is what later scrapes are compared against. Its LRU has its own
+    size, `seen_max_entries`; without SQLite a URL pushed out of it is
+    reported as new again.
+    """
+
+    def __init__(self, serp_ttl=600, page_ttl=3600, max_entries=500, path=None, seen_ttl=604800,
+                 seen_max_entries=10000):
+        self.ttl = {'serp': serp_ttl, 'page': page_ttl, 'seen': seen_ttl}
+        self._memory = {
+            'serp': MemoryTier(max_entries),
+            'page': MemoryTier(max_entries),
+            'seen': MemoryTier(seen_max_entries),
+        }
+        self._disk = SQLiteTier(path) if path else None
+        self._stats = {tier: {'hits': 0, 'misses': 0, 'writes': 0} for tier in self.ttl}
+
+    async def _get(self, tier, key):
+        entry = self._memory[tier].get(key)
+        if entry is None and self._disk:
+            entry = await asyncio.to_thread(self._disk.get, tier, key)
+            if entry is not None:
+                self._memory[tier].set(key, *entry)
+        self._stats[tier]['hits' if entry else 'misses'] += 1
+        return entry[0] if entry else None
+
+    async def _set(self, tier, key, value):
+        expires_at = time.time() + self.ttl[tier]
+        self._memory[tier].set(key, value, expires_at)
+        if self._disk:
+            await asyncio.to_thread(self._disk.set, tier, key, value, expires_at)
+        self._stats[tier]['writes'] += 1
+
+    async def get_serp(self, search_url, num_results):
+        """Cached search results, or None unless the entry can satisfy num_results"""
+        entry = await self._get('serp', normalize_url(search_url))
+        if entry is None:
+            return None
+        # An entry extracted for fewer results only counts if the SERP ran out
+        if entry['requested'] < num_results and len(entry['results']) >= entry['requested']:
+            self._stats['serp']['hits'] -= 1
+            self._stats['serp']['misses'] += 1
+            return None
+        return entry['results'][:num_results]
+
+    async def set_serp(self, search_url, num_results, results):
+        await self._set('serp', normalize_url(search_url), {
+            'requested': num_results,
+            'results': results,
+        })
+
+    async def get_page(self, url):
+        return await self._get('page', normalize_url(url))
+
+    async def set_page(self, url, content):
+        await self._set('page', normalize_url(url), content)
+
+    async def get_seen(self, url):
+        """{'hash', 'content'} of the last incremental scrape of `url`, or None"""
+        return await self._get('seen', normalize_url(url))
+
+    async def set_seen(self, url, content):
+        await self._set('seen', normalize_url(url), {
+            'hash': content_hash(content.get('main_text', '')),
+            'content': content,
+        })
+
+    def clear(self):
+        for tier in self._memory.values():
+            tier.clear()
+        if self._disk:
+            self._disk.clear()
+
+    def close(self):
+        if self._disk:
+            self._disk.close()
+
+    def stats(self):
+        return {
+            tier: {
+                'ttl_seconds': self.ttl[tier],
+                'memory_entries': len(self._memory[tier]),
+                'disk_entries': self._disk.count(tier) if self._disk else None,
+                **self._stats[tier],
+            }
+            for tier in self.ttl
+        }
@@ -0,0 +1,51 @@
+"""
+SERP Extractor Module
+Google result-link extraction, run in-page in a single round-trip
+"""
+
+RESULTS_PER_PAGE = 10
+
+# Organic results a SERP page usually yields once ads and widgets are skipped;
+# used to decide how many pages to fetch at once
+EXPECTED_RESULTS_PER_PAGE = 8
+
+MAX_SERP_PAGES = 6
+
+TITLE_SELECTORS = {
+    'web': 'h3',
+    'news': 'div[role="heading"]',
+}
+
+# Titles and target URLs of every result on the page, in page order
+SERP_LINKS_SCRIPT = """
+(selector) => {
+    const links = [];
+    const seen = new Set();
+    for (const el of document.querySelectorAll(selector)) {
+        const title = (el.innerText || '').trim();
+        if (!title) {
+            continue;
+        }
+        const anchor = el.closest('a');
+        const url = anchor ? anchor.href : '';
+        if (!url || !url.startsWith('http') || seen.has(url)) {
+            continue;
+        }
+        seen.add(url);
+        links.push({title: title, url: url});
+    }
+    return links;
+}
+"""
+
+
+def serp_page_url(search_url, index):
+    """URL of the `index`-th (0-based) result page for a Google search URL"""
+    if index == 0:
+        return search_url
+    return f"{search_url}&start={index * RESULTS_PER_PAGE}"
+
+
+async def extract_serp_links(page, search_type='web'):
+    """Result links of a loaded SERP page as [{'title', 'url'}]"""
+    return await page.evaluate(SERP_LINKS_SCRIPT, TITLE_SELECTORS.get(search_type, 'h3'))
@@ -0,0 +1,307 @@
+"""
+Steel Session Pool
+Keeps warm Steel Browser sessions with live Playwright connections
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+
+from steel_client import SteelClient
+
+logger = logging.getLogger(__name__)
+
+
+class PooledSession:
+    """A Steel session together with its CDP browser connection"""
+
+    def __init__(self, session_id, websocket_url, browser, context):
+        self.session_id = session_id
+        self.websocket_url = websocket_url
+        self.browser = browser
+        self.context = context
+        self.uses = 0
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.discard = False
+
+    def is_connected(self):
+        return self.browser.is_connected()
+
+    def idle_seconds(self):
+        return time.monotonic() - self.last_used
+
+
+class SteelSessionPool:
+    """
+    Pool of pre-created Steel sessions shared across requests.
+
+    Sessions are leased with `async with pool.lease() as session:` and are
+    recycled after `max_uses` leases or `max_idle` seconds without use.
+
+    `size` sessions are kept warm. When all of them are leased, a lease
+    creates an overflow session on demand instead of waiting; on return it
+    refills the warm set if there is room there, else it is released. With
+    `max_overflow` set, leases beyond `size + max_overflow` wait (up to
+    `acquire_timeout`) for one to come back.
+    """
+
+    def __init__(self, steel_url, size=2, max_uses=20, max_idle=240,
+                 acquire_timeout=60, check_interval=30, client=None, max_overflow=None):
+        self.steel_url = steel_url.rstrip('/')
+        self._owns_client = client is None
+        self.client = client or SteelClient(self.steel_url)
+        self.size = size
+        self.max_uses = max_uses
+        self.max_idle = max_idle
+        self.acquire_timeout = acquire_timeout
+        self.check_interval = check_interval
+        self.max_overflow = max_overflow
+
+        self._playwright = None
+        self._owns_playwright = False
+        self._idle = []
+        self._leased = set()
+        self._pending = 0
+        self._slots = asyncio.Semaphore(size + max_overflow) if max_overflow is not None else None
+        self._lock = asyncio.Lock()
+        self._maintenance_task = None
+        self._closed = False
+
+        self._stats = {
+            'created': 0,
+            'recycled': 0,
+            'create_failures': 0,
+            'leases': 0,
+            'overflow_leases': 0,
+            'lease_wait_total': 0.0,
+        }
+
+    # ---- Session lifecycle ----
+
+    async def _create(self):
+        """Create a Steel session and connect to it over CDP"""
+        try:
+            data = await self.client.create_session()
+        except Exception as e:
+            self._stats['create_failures'] += 1
+            raise Exception(f"Failed to create session: {str(e)}")
+
+        session_id = data.get('id')
+        websocket_url = data.get('websocketUrl')
+        try:
+            browser = await self._playwright.chromium.connect_over_cdp(websocket_url)
+            context = browser.contexts[0] if browser.contexts else await browser.new_context()
+        except Exception as e:
+            self._stats['create_failures'] += 1
+            await self._release_remote(session_id)
+            raise Exception(f"Failed to connect to session {session_id}: {str(e)}")
+
+        self._stats['created'] += 1
+        logger.info("Pool: session %s ready", session_id)
+        return PooledSession(session_id, websocket_url, browser, context)
+
+    async def _release_remote(self, session_id):
+        try:
+            await self.client.release_session(session_id)
+        except Exception as e:
+            logger.warning("Pool: failed to release session %s: %s", session_id, e)
+
+    async def _destroy(self, session):
+        """Disconnect from and release a pooled session"""
+        self._stats['recycled'] += 1
+        try:
+            await session.browser.close()
+        except Exception:
+            pass
+        await self._release_remote(session.session_id)
+
+    def _is_reusable(self, session):
+        return (
+            not session.discard
+            and session.is_connected()
+            and session.uses < self.max_uses
+            and session.idle_seconds() < self.max_idle
+        )
+
+    async def _ping(self, session):
+        """Round-trip health check over the CDP connection"""
+        try:
+            await asyncio.wait_for(session.context.cookies(), timeout=5)
+            return True
+        except Exception:
+            return False
+
+    # ---- Public API ----
+
+    async def start(self, playwright=None):
+        """
+        Start warming up the pool on a shared Playwright driver, or one of its own
+
+        Returns without waiting for the warm sessions: a slow or unreachable
+        Steel must not hold up server startup (and /health). Leases taken
+        meanwhile create their sessions on demand.
+        """
+        self._owns_playwright = playwright is None
+        self._playwright = playwright or await async_playwright().start()
+        self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+        logger.info("Pool: started, warming up %d sessions in the background", self.size)
+
+    async def close(self):
+        """Release every session and stop the Playwright driver if the pool started it"""
+        self._closed = True
+        if self._maintenance_task:
+            self._maintenance_task.cancel()
+            try:
+                await self._maintenance_task
+            except asyncio.CancelledError:
+                pass
+
+        async with self._lock:
+            sessions = self._idle + list(self._leased)
+            self._idle = []
+            self._leased.clear()
+        await asyncio.gather(*(self._destroy(s) for s in sessions), return_exceptions=True)
+
+        if self._playwright and self._owns_playwright:
+            await self._playwright.stop()
+        self._playwright = None
+        if self._owns_client:
+            await self.client.close()
+
+    @asynccontextmanager
+    async def lease(self):
+        """Lease a warm session for the duration of the block"""
+        if self._closed:
+            raise Exception("Session pool is closed")
+
+        started = time.monotonic()
+        if self._slots is not None:
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.acquire_timeout)
+            except asyncio.TimeoutError:
+                raise Exception(f"Timed out after {self.acquire_timeout}s waiting for a pooled session")
+
+        session = None
+        try:
+            session = await self._take()
+            self._stats['leases'] += 1
+            self._stats['lease_wait_total'] += time.monotonic() - started
+            yield session
+        except BaseException:
+            if session is not None and not session.is_connected():
+                session.discard = True
+            raise
+        finally:
+            if session is not None:
+                await self._give_back(session)
+            if self._slots is not None:
+                self._slots.release()
+
+    async def _take(self):
+        while True:
+            async with self._lock:
+                session = self._idle.pop() if self._idle else None
+            if session is None:
+                if len(self._leased) + self._pending >= self.size:
+                    self._stats['overflow_leases'] += 1
+                self._pending += 1
+                try:
+                    session = await self._create()
+                finally:
+                    self._pending -= 1
+            elif not self._is_reusable(session):
+                asyncio.create_task(self._destroy(session))
+                continue
+            async with self._lock:
+                self._leased.add(session)
+            return session
+
+    async def _give_back(self, session):
+        session.uses += 1
+        session.last_used = time.monotonic()
+        async with self._lock:
+            self._leased.discard(session)
+            # Overflow sessions only stay if the warm set has room for them
+            keep = (not self._closed and self._is_reusable(session)
+                    and len(self._idle) + len(self._leased) < self.size)
+            if keep:
+                self._idle.append(session)
+        if not keep:
+            asyncio.create_task(self._destroy(session))
+            if not self._closed:
+                # No-op unless the warm set is short (e.g. this session was worn out)
+                asyncio.create_task(self._fill())
+
+    async def _fill(self):
+        """Top the pool up to `size` warm sessions"""
+        async with self._lock:
+            missing = self.size - len(self._idle) - len(self._leased) - self._pending
+            if missing <= 0:
+                return
+            self._pending += missing
+
+        try:
+            created = await asyncio.gather(*(self._create() for _ in range(missing)),
+                                           return_exceptions=True)
+        finally:
+            self._pending -= missing
+        async with self._lock:
+            for session in created:
+                if isinstance(session, Exception):
+                    logger.warning("Pool: %s", session)
+                    continue
+                if self._closed or len(self._idle) + len(self._leased) >= self.size:
+                    asyncio.create_task(self._destroy(session))
+                else:
+                    self._idle.append(session)
+
+    async def _maintenance_loop(self):
+        try:
+            await self._fill()
+            logger.info("Pool: warmed up with %d/%d sessions", len(self._idle), self.size)
+        except Exception as e:
+            logger.warning("Pool: warm-up failed: %s", e)
+        while not self._closed:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await self._check_idle()
+                await self._fill()
+            except Exception as e:
+                logger.warning("Pool: maintenance failed: %s", e)
+
+    async def _check_idle(self):
+        """Recycle idle sessions that expired or fail the health check"""
+        async with self._lock:
+            candidates = list(self._idle)
+
+        stale = []
+        for session in candidates:
+            if not self._is_reusable(session) or not await self._ping(session):
+                stale.append(session)
+
+        async with self._lock:
+            # A session may have been leased while we were pinging: leave it to its lessee
+            stale = [s for s in stale if s in self._idle]
+            self._idle = [s for s in self._idle if s not in stale]
+        for session in stale:
+            await self._destroy(session)
+
+    def stats(self):
+        """Snapshot of pool usage"""
+        leases = self._stats['leases']
+        return {
+            'size': self.size,
+            'idle': len(self._idle),
+            'leased': len(self._leased),
+            'max_uses': self.max_uses,
+            'max_idle_seconds': self.max_idle,
+            'sessions_created': self._stats['created'],
+            'sessions_recycled': self._stats['recycled'],
+            'create_failures': self._stats['create_failures'],
+            'leases': leases,
+            'overflow_leases': self._stats['overflow_leases'],
+            'avg_lease_wait_ms': round(self._stats['lease_wait_total'] / leases * 1000, 2) if leases else 0.0,
+        }
@@ -0,0 +1,282 @@
+"""
+Steel Backends
+Session creation spread over several Steel Browser instances, with failover and circuit breaking
+"""
+
+import asyncio
+import logging
+import random
+import time
+import httpx
+
+from steel_client import SteelClient, RETRY_STATUS_CODES
+from metrics import BACKEND_FAILURES
+
+
+logger = logging.getLogger(__name__)
+
+
+# least_sessions: fewest open sessions first, ties broken by latency;
+# latency: lowest recent session-creation latency first
+BALANCE_STRATEGIES = ['least_sessions', 'latency']
+
+# Weight of the newest sample in the moving average of session-creation latency
+LATENCY_SMOOTHING = 0.3
+
+
+class NoBackendAvailable(Exception):
+    pass
+
+
+def parse_steel_urls(value):
+    """Steel URLs from a comma-separated string or a list"""
+    urls = value.split(',') if isinstance(value, str) else value
+    return [url.strip().rstrip('/') for url in urls if url and url.strip()]
+
+
+def is_backend_failure(error):
+    """Whether an error says something about the backend (not about the request)"""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status >= 500 or status in RETRY_STATUS_CODES
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError))
+
+
+class SteelBackend:
+    """
+    One Steel instance: its client, open-session count and circuit breaker.
+
+    The circuit opens after `failure_threshold` consecutive failures and the
+    backend is skipped. After `reset_timeout` seconds one trial request is
+    let through (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, url, client, failure_threshold=3, reset_timeout=30):
+        self.url = url
+        self.client = client
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.active = 0
+        self.latency = None
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self._stats = {
+            'created': 0,
+            'create_failures': 0,
+            'released': 0,
+            'release_failures': 0,
+            'trips': 0,
+        }
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def available(self):
+        state = self.state
+        return state == 'closed' or (state == 'half_open' and not self.trial_in_flight)
+
+    def record_success(self, latency=None):
+        if latency is not None:
+            self.latency = latency if self.latency is None else (
+                LATENCY_SMOOTHING * latency + (1 - LATENCY_SMOOTHING) * self.latency
+            )
+        if self.opened_at is not None:
+            logger.info("Steel backend %s recovered, circuit closed", self.url)
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self, error):
+        self.failures += 1
+        BACKEND_FAILURES.inc(backend=self.url)
+        if self.opened_at is None and self.failures < self.failure_threshold:
+            return
+        if self.opened_at is None:
+            self._stats['trips'] += 1
+            logger.warning("Steel backend %s failed %d times in a row (%s), circuit open for %ss",
+                           self.url, self.failures, error, self.reset_timeout)
+        # A failure while open or half-open restarts the wait
+        self.opened_at = time.monotonic()
+
+    def stats(self):
+        state = self.state
+        return {
+            'url': self.url,
+            'state': state,
+            'active_sessions': self.active,
+            'latency_ms': round(self.latency * 1000) if self.latency is not None else None,
+            'consecutive_failures': self.failures,
+            'retry_in_seconds': round(self.reset_timeout - (time.monotonic() - self.opened_at), 1)
+            if state == 'open' else None,
+            'sessions_created': self._stats['created'],
+            'create_failures': self._stats['create_failures'],
+            'sessions_released': self._stats['released'],
+            'release_failures': self._stats['release_failures'],
+            'circuit_trips': self._stats['trips'],
+        }
+
+
+class SteelBalancer:
+    """
+    Drop-in SteelClient for several Steel instances.
+
+    Each new session goes to the best available backend for `strategy`;
+    when creation fails there it is retried on the next one, so a dead
+    instance costs one failed attempt until its circuit opens and then none.
+    Sessions are released on the backend that created them. With more than
+    one backend each client retries only once before the balancer moves on.
+    """
+
+    def __init__(self, urls, strategy='least_sessions', failure_threshold=3, reset_timeout=30,
+                 **client_options):
+        urls = parse_steel_urls(urls)
+        if not urls:
+            raise ValueError("At least one Steel URL is required")
+        if strategy not in BALANCE_STRATEGIES:
+            raise ValueError(f"strategy must be one of: {', '.join(BALANCE_STRATEGIES)}")
+        if len(urls) > 1:
+            client_options.setdefault('retries', 1)
+
+        self.strategy = strategy
+        self.steel_url = ', '.join(urls)
+        self.backends = [
+            SteelBackend(url, SteelClient(url, **client_options), failure_threshold, reset_timeout)
+            for url in urls
+        ]
+        self._owners = {}
+
+    def _ranked(self):
+        """Available backends, best first"""
+        backends = [backend for backend in self.backends if backend.available()]
+        # Shuffle first so ties don't always land on the first URL
+        random.shuffle(backends)
+        # Unmeasured backends sort first so they get a latency sample
+        if self.strategy == 'latency':
+            return sorted(backends, key=lambda b: (b.latency or 0, b.active))
+        return sorted(backends, key=lambda b: (b.active, b.latency or 0))
+
+    async def create_session(self, **options):
+        """Create a session on the best backend, failing over to the others"""
+        backends = self._ranked()
+        if not backends:
+            raise NoBackendAvailable(
+                f"No Steel backend available: all {len(self.backends)} circuits are open"
+            )
+
+        errors = []
+        for backend in backends:
+            # Earlier attempts awaited: another request may have tripped or trialled it since
+            if not backend.available():
+                continue
+            trial = backend.state == 'half_open'
+            if trial:
+                backend.trial_in_flight = True
+            # Counted from the start so concurrent creations spread out
+            backend.active += 1
+            started = time.monotonic()
+            try:
+                data = await backend.client.create_session(**options)
+            except BaseException as e:
+                backend.active -= 1
+                if not isinstance(e, Exception) or not is_backend_failure(e):
+                    raise
+                backend._stats['create_failures'] += 1
+                backend.record_failure(e)
+                errors.append(f"{backend.url}: {e}")
+                logger.warning("Steel backend %s could not create a session: %s", backend.url, e)
+                continue
+            finally:
+                if trial:
+                    backend.trial_in_flight = False
+
+            backend.record_success(time.monotonic() - started)
+            backend._stats['created'] += 1
+            if data.get('id'):
+                self._owners[data['id']] = backend
+            logger.debug("Session %s created on %s", data.get('id'), backend.url)
+            return data
+
+        if not errors:
+            raise NoBackendAvailable("No Steel backend available: circuits opened meanwhile")
+        raise NoBackendAvailable(f"Every Steel backend failed: {'; '.join(errors)}")
+
+    async def release_session(self, session_id):
+        """Release a session on the backend that created it"""
+        backend = self._owners.pop(session_id, None)
+        if backend is None:
+            # Not created through this balancer (e.g. before a restart): try each backend
+            for backend in self.backends:
+                try:
+                    await backend.client.release_session(session_id)
+                    return
+                except Exception:
+                    continue
+            raise Exception(f"No Steel backend could release session {session_id}")
+
+        try:
+            await backend.client.release_session(session_id)
+        except BaseException as e:
+            if isinstance(e, Exception):
+                backend._stats['release_failures'] += 1
+                if is_backend_failure(e):
+                    backend.record_failure(e)
+            raise
+        finally:
+            backend.active = max(0, backend.active - 1)
+        backend._stats['released'] += 1
+        backend.record_success()
+
+    async def list_sessions(self):
+        """Sessions of every reachable backend, as {'sessions': [...]}"""
+        results = await asyncio.gather(*(b.client.list_sessions() for b in self.backends),
+                                       return_exceptions=True)
+        sessions = []
+        for backend, result in zip(self.backends, results):
+            if isinstance(result, Exception):
+                logger.warning("Could not list sessions on %s: %s", backend.url, result)
+                continue
+            sessions.extend(result.get('sessions', []) if isinstance(result, dict) else result)
+        return {'sessions': sessions}
+
+    async def probe(self, timeout=5):
+        """
+        Probe every backend at once; reachable if any backend is.
+
+        Failed probes count towards opening a closed circuit, so a dead
+        instance is skipped even before a search hits it; they never restart
+        an open circuit's wait. A successful probe closes the circuit.
+        """
+        results = await asyncio.gather(*(b.client.probe(timeout=timeout) for b in self.backends))
+        for backend, result in zip(self.backends, results):
+            if result['reachable']:
+                backend.record_success()
+            elif backend.state == 'closed':
+                backend.record_failure(result['error'])
+
+        reachable = [result for result in results if result['reachable']]
+        return {
+            'reachable': bool(reachable),
+            'latency_ms': min(r['latency_ms'] for r in reachable) if reachable
+            else max(r['latency_ms'] for r in results),
+            'error': None if reachable
+            else '; '.join(f"{b.url}: {r['error']}" for b, r in zip(self.backends, results)),
+            'backends': [
+                {'url': backend.url, 'state': backend.state, **result}
+                for backend, result in zip(self.backends, results)
+            ],
+        }
+
+    def stats(self):
+        """Per-backend load and circuit state"""
+        return {
+            'strategy': self.strategy,
+            'backends': [backend.stats() for backend in self.backends],
+        }
+
+    async def close(self):
+        await asyncio.gather(*(b.client.close() for b in self.backends), return_exceptions=True)
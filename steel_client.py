@@ -0,0 +1,107 @@
+"""
+Steel Control-Plane Client
+Non-blocking client for the Steel Browser sessions API
+"""
+
+import asyncio
+import logging
+import random
+import time
+import httpx
+
+
+logger = logging.getLogger(__name__)
+
+
+# Status codes worth retrying: Steel overloaded, restarting or behind a proxy hiccup
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+
+# The subset that means Steel turned the request away: only these are retried for
+# session creation, since behind a 502/504 the session may well have been created
+REJECTED_STATUS_CODES = {429, 503}
+
+
+class SteelClient:
+    """
+    Async client for Steel's /v1/sessions API.
+
+    Uses one pooled keep-alive connection set for every call. Requests that
+    fail with a connection error or a retryable status are retried with
+    exponential backoff; session creation is not retried on read timeouts
+    or 502/504 because Steel may already have started the session.
+    """
+
+    def __init__(self, steel_url, create_timeout=180, release_timeout=30, connect_timeout=10,
+                 retries=3, backoff=0.5, max_connections=20):
+        self.steel_url = steel_url.rstrip('/')
+        self.create_timeout = create_timeout
+        self.release_timeout = release_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._http = httpx.AsyncClient(
+            base_url=self.steel_url,
+            headers={'Content-Type': 'application/json'},
+            timeout=httpx.Timeout(30, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections),
+        )
+
+    async def _request(self, method, path, timeout, idempotent, **kwargs):
+        attempt = 0
+        while True:
+            retry_codes = RETRY_STATUS_CODES if idempotent else REJECTED_STATUS_CODES
+            try:
+                response = await self._http.request(method, path, timeout=timeout, **kwargs)
+                if response.status_code in retry_codes and attempt < self.retries:
+                    raise httpx.HTTPStatusError(
+                        f"Steel returned {response.status_code}",
+                        request=response.request, response=response
+                    )
+                response.raise_for_status()
+                return response
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                retryable = (
+                    isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+                    or (isinstance(e, httpx.HTTPStatusError)
+                        and e.response.status_code in retry_codes)
+                    or (idempotent and isinstance(e, httpx.TransportError))
+                )
+                if not retryable or attempt >= self.retries:
+                    raise
+                delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+                attempt += 1
+                logger.warning("Steel %s %s failed (%s), retry %d/%d in %.1fs",
+                               method, path, e, attempt, self.retries, delay)
+                await asyncio.sleep(delay)
+
+    async def create_session(self, **options):
+        """Create a browser session; returns Steel's session payload"""
+        response = await self._request('POST', '/v1/sessions', self.create_timeout,
+                                       idempotent=False, json=options)
+        return response.json()
+
+    async def release_session(self, session_id):
+        """Release a browser session"""
+        await self._request('POST', f'/v1/sessions/{session_id}/release',
+                            self.release_timeout, idempotent=True)
+
+    async def list_sessions(self):
+        """List sessions currently known to Steel"""
+        response = await self._request('GET', '/v1/sessions', self.release_timeout,
+                                       idempotent=True)
+        return response.json()
+
+    async def probe(self, timeout=5):
+        """Single unretried round-trip to Steel, for readiness checks"""
+        started = time.monotonic()
+        try:
+            response = await self._http.get('/v1/sessions', timeout=timeout)
+            response.raise_for_status()
+            return {'reachable': True, 'latency_ms': round((time.monotonic() - started) * 1000),
+                    'error': None}
+        except Exception as e:
+            return {'reachable': False, 'latency_ms': round((time.monotonic() - started) * 1000),
+                    'error': str(e) or type(e).__name__}
+
+    async def close(self):
+        await self._http.aclose()
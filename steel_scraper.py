@@ -4,68 +4,156 @@ Core scraping logic for search and deep content extraction
 """
 
 import asyncio
+import functools
+import math
+import time
+from collections import Counter
+from contextlib import asynccontextmanager, AsyncExitStack
 from playwright.async_api import async_playwright
 import requests
 import json
 from datetime import datetime
+from urllib.parse import urlparse
 import logging
+import httpx
+
+from steel_client import SteelClient
+from steel_backends import SteelBalancer, parse_steel_urls
+from content_extractor import extract_from_page, extract_from_html
+from http_fetcher import HttpFetcher, fallback_reason
+from wait_strategy import Deadline, DeadlineExceeded, navigate
+from resource_blocking import ResourceBlocker
+from result_cache import content_hash, normalize_url
+from tracing import Trace, current_trace, span
+from metrics import PAGE_CHANGES, SESSIONS_ACTIVE, observe_page, observe_search
+from consent import ConsentHandler, CONSENT_PAGE_WAIT_MS
+from serp_extractor import EXPECTED_RESULTS_PER_PAGE, MAX_SERP_PAGES, extract_serp_links, serp_page_url
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+GOOGLE_SEARCH_URL = "https://www.google.com/search"
+
+
+def tracked(method):
+    """Register the calling task as a running scrape while `method` runs, for drain()"""
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        task = asyncio.current_task()
+        self._running[task] += 1
+        try:
+            return await method(self, *args, **kwargs)
+        finally:
+            self._running[task] -= 1
+            if not self._running[task]:
+                del self._running[task]
+    return wrapper
+
 
 class SteelBrowserScraper:
-    def __init__(self, steel_url):
-        self.steel_url = steel_url.rstrip('/')
+    """
+    Search and scrape over Steel sessions.
+
+    One instance can serve any number of concurrent requests. After start()
+    every session is driven by one shared Playwright driver; without it each
+    session starts a driver of its own (fine for scripts, slow under load).
+    """
+
+    def __init__(self, steel_url, pool=None, client=None, cache=None, consent=None, fetcher=None,
+                 search_url=GOOGLE_SEARCH_URL, playwright=None):
+        # One Steel URL, or several (list or comma-separated) to balance sessions over
+        urls = parse_steel_urls(steel_url)
+        self.steel_url = ', '.join(urls)
+        # Google-compatible search endpoint (a local fake SERP in benchmarks)
+        self.search_url = search_url
+        self.pool = pool
+        self.cache = cache
+        self.consent = consent or ConsentHandler()
+        self._owns_client = client is None
+        self.client = client or (SteelBalancer(urls) if len(urls) > 1 else SteelClient(urls[0]))
+        self._owns_fetcher = fetcher is None
+        self.fetcher = fetcher or HttpFetcher()
+        self._owns_playwright = False
+        self.playwright = playwright
+        self._running = Counter()
         self.session_id = None
         self.websocket_url = None
-        
-    def create_session(self):
+    
+    async def start(self):
+        """Start the shared Playwright driver, unless one was passed in"""
+        if self.playwright is None:
+            self.playwright = await async_playwright().start()
+            self._owns_playwright = True
+            logger.info("Playwright driver started")
+    
+    async def create_session(self):
         """Create a new browser session on Steel Browser"""
+        data = await self._create_session()
+        # Kept for standalone use with release_session(); concurrent scrapes don't use these
+        self.session_id = data.get('id')
+        self.websocket_url = data.get('websocketUrl')
+        return data
+    
+    async def _create_session(self):
         try:
-            print(f"[LOG] Creating session with Steel Browser at {self.steel_url}")
-            response = requests.post(
-                f"{self.steel_url}/v1/sessions",
-                headers={'Content-Type': 'application/json'},
-                json={},
-                timeout=180  # 3 minutes
-            )
-            response.raise_for_status()
-            data = response.json()
+            logger.info("Creating session with Steel Browser at %s", self.steel_url)
+            with span('session_create'):
+                data = await self.client.create_session()
             
-            self.session_id = data.get('id')
-            self.websocket_url = data.get('websocketUrl')
-            
-            print(f"[LOG] ✓ Session created successfully: {self.session_id}")
-            print(f"[LOG] WebSocket URL: {self.websocket_url}")
+            logger.info("Session created: %s", data.get('id'))
+            logger.debug("WebSocket URL: %s", data.get('websocketUrl'))
             
             return data
         except Exception as e:
-            print(f"[ERROR] Failed to create session: {str(e)}")
+            logger.error("Failed to create session: %s", e)
             raise Exception(f"Failed to create session: {str(e)}")
     
-    def release_session(self):
+    async def release_session(self, session_id=None):
         """Release the browser session"""
-        if not self.session_id:
-            print(f"[LOG] No session to release")
+        session_id = session_id or self.session_id
+        if not session_id:
+            logger.debug("No session to release")
             return
             
         try:
-            print(f"[LOG] Releasing session: {self.session_id}")
-            response = requests.post(
-                f"{self.steel_url}/v1/sessions/{self.session_id}/release",
-                headers={'Content-Type': 'application/json'},
-                timeout=30  # 30 seconds for release
-            )
-            response.raise_for_status()
-            print(f"[LOG] ✓ Session released successfully")
+            logger.info("Releasing session: %s", session_id)
+            with span('session_release'):
+                await self.client.release_session(session_id)
+            logger.debug("Session %s released", session_id)
         except Exception as e:
-            print(f"[WARNING] Failed to release session: {e}")
+            logger.warning("Failed to release session %s: %s", session_id, e)
+    
+    async def drain(self, timeout=30):
+        """
+        Wait up to `timeout` seconds for running scrapes, then cancel the rest.
+
+        Cancelled scrapes unwind normally, so their pages are closed and their
+        sessions released before this returns.
+        """
+        tasks = [task for task in self._running if not task.done()]
+        if not tasks:
+            return
+        logger.info("Waiting up to %ss for %d running scrapes", timeout, len(tasks))
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        if pending:
+            logger.warning("Cancelling %d scrapes still running after %ss", len(pending), timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+    
+    async def close(self):
+        """Close the Steel and HTTP clients and the Playwright driver if this scraper created them"""
+        if self._owns_client:
+            await self.client.close()
+        if self._owns_fetcher:
+            await self.fetcher.close()
+        if self._owns_playwright:
+            await self.playwright.stop()
+            self.playwright = None
+            self._owns_playwright = False
     
     def build_google_url(self, query, language='it', region='it', search_type='web', time_filter=None):
         """Build Google search URL with filters"""
-        base_url = "https://www.google.com/search"
+        base_url = self.search_url
         
         params = {
             'q': query,
@@ -92,288 +180,931 @@ class SteelBrowserScraper:
         param_string = '&'.join([f'{k}={requests.utils.quote(str(v))}' for k, v in params.items()])
         return f"{base_url}?{param_string}"
     
+    @tracked
     async def search_and_extract(self, query, language='it', region='it', 
-                                 search_type='web', time_filter=None, num_results=5):
+                                 search_type='web', time_filter=None, num_results=5,
+                                 concurrency=1, per_host_concurrency=2,
+                                 wait_until='stable', page_timeout=30, request_timeout=240,
+                                 block=None, cache_mode='prefer', fetch_mode='auto',
+                                 incremental=False, changes_only=False, report=None,
+                                 on_event=None, collect=True):
         """
         Complete workflow: Search + Deep scrape each result
+        
+        With concurrency > 1 result pages are scraped in parallel tabs, at most
+        `concurrency` at once and `per_host_concurrency` per host.
+        
+        Result pages are considered ready according to `wait_until` (see
+        wait_strategy.WAIT_STRATEGIES). Each page gets `page_timeout` seconds and
+        the whole request `request_timeout` seconds; pages that run out of
+        budget are returned with `error` set.
+        
+        `block` lists request categories to abort (see
+        resource_blocking.BLOCK_CATEGORIES). Request-level stats such as
+        blocked requests are written into the optional `report` dict.
+        
+        With a result cache configured, `cache_mode` is 'prefer' (serve fresh
+        entries, scrape the rest), 'bypass' (always scrape, refresh the cache)
+        or 'only' (never open a browser; uncached pages come back with error).
+        
+        `fetch_mode` 'auto' fetches result pages over plain HTTP first and
+        opens a tab only for pages that look JS-rendered or blocked;
+        'browser' always uses a tab and 'http' never does (see
+        http_fetcher.FETCH_MODES). Each result reports `fetched_via`.
+        
+        `incremental` (needs the result cache) re-checks every result page
+        instead of serving the page tier, with a conditional GET when the
+        last HTTP fetch left an ETag or Last-Modified, and marks each result
+        `change` 'new', 'changed' or 'unchanged' by comparing the hash of
+        its main text with the last scrape. A 304 reuses the stored page.
+        With `changes_only` unchanged results are left out (streamed as an
+        'unchanged' event instead). Counts go into `report['changes']`.
+        
+        `on_event` is awaited with each 'serp' and 'result' event as it
+        happens; with `collect=False` results are only delivered that way and
+        the returned list is empty.
+        
+        Per-stage timings (see tracing.Trace.summary) go into
+        `report['timings']`.
         """
-        print(f"\n[LOG] ========== STARTING SEARCH AND EXTRACT ==========")
-        print(f"[LOG] Query: {query}")
-        print(f"[LOG] Language: {language}, Region: {region}")
-        print(f"[LOG] Search Type: {search_type}, Time Filter: {time_filter}")
-        print(f"[LOG] Num Results: {num_results}")
+        logger.info("Starting search: query=%r language=%s region=%s type=%s time_filter=%s "
+                    "num_results=%d concurrency=%d wait=%s page_timeout=%ss request_timeout=%ss",
+                    query, language, region, search_type, time_filter, num_results,
+                    concurrency, wait_until, page_timeout, request_timeout)
         
         search_url = self.build_google_url(query, language, region, search_type, time_filter)
-        print(f"[LOG] Google URL: {search_url}")
+        logger.debug("Google URL: %s", search_url)
         
-        # Create session
-        print(f"[LOG] Step 1: Creating browser session...")
-        self.create_session()
+        options = self._build_options(concurrency, per_host_concurrency, wait_until, page_timeout,
+                                      request_timeout, block, cache_mode, fetch_mode, report,
+                                      on_event, collect, incremental, changes_only, language)
         
-        all_results = []
+        trace = Trace()
+        token = current_trace.set(trace)
+        outcome = 'success'
+        try:
+            search_results = None
+            if self.cache:
+                search_results = await self._cached_serp(search_url, num_results, options)
+                if search_results is not None:
+                    # Pages come from the cache or over HTTP where they can; a browser
+                    # session is opened only once a page falls back to it
+                    async with AsyncExitStack() as stack:
+                        async def open_page():
+                            logger.info("Opening a browser session for pages that need one")
+                            page = await stack.enter_async_context(self._open_page())
+                            await options['blocker'].install(page.context)
+                            stack.push_async_callback(self._remove_blocker, options)
+                            return page
+                        
+                        return await self._scrape_results(None, search_results, options, open_page)
+                elif cache_mode == 'only':
+                    logger.info("SERP not cached and cache='only': returning no results")
+                    return await self._scrape_results(None, [], options)
+            
+            async with self._open_page() as page:
+                return await self._search_on_page(page, search_url, search_type, num_results,
+                                                  options, search_results)
+        except asyncio.CancelledError:
+            outcome = 'cancelled'
+            raise
+        except Exception as e:
+            outcome = 'error'
+            self._log_failure(e)
+            raise Exception(f"Scraping failed: {str(e)}")
+        finally:
+            current_trace.reset(token)
+            options['report']['timings'] = trace.summary()
+            observe_search(trace, outcome)
+    
+    def _build_options(self, concurrency=1, per_host_concurrency=2, wait_until='stable',
+                       page_timeout=30, request_timeout=240, block=None, cache_mode='prefer',
+                       fetch_mode='auto', report=None, on_event=None, collect=True,
+                       incremental=False, changes_only=False, language=None):
+        """Per-request settings and state threaded through the scraping steps"""
+        if incremental and not self.cache:
+            raise ValueError("Incremental scraping needs the result cache")
+        return {
+            'concurrency': concurrency,
+            'per_host_concurrency': per_host_concurrency,
+            'wait_until': wait_until,
+            'page_timeout': page_timeout,
+            'deadline': Deadline(request_timeout, name='request'),
+            'blocker': ResourceBlocker(block or []),
+            'cache': self.cache,
+            'cache_mode': cache_mode,
+            'fetch_mode': fetch_mode,
+            'report': report if report is not None else {},
+            'emit': on_event,
+            'collect': collect,
+            'incremental': incremental,
+            'changes_only': changes_only,
+            'language': language,
+        }
+    
+    async def iter_search_and_extract(self, query, **kwargs):
+        """
+        Async generator version of search_and_extract
         
-        async with async_playwright() as p:
-            try:
-                # Connect to Steel Browser
-                print(f"[LOG] Step 2: Connecting to browser via CDP...")
-                browser = await p.chromium.connect_over_cdp(self.websocket_url)
-                print(f"[LOG] ✓ Connected to browser successfully")
-                
-                # Get or create context and page
-                print(f"[LOG] Step 3: Getting browser context and page...")
-                contexts = browser.contexts
+        Yields a 'serp' event with the result links, one 'result' event per
+        page in completion order, then a 'summary' event (or an 'error' event
+        if the search failed). Takes the same keyword arguments.
+        """
+        queue = asyncio.Queue()
+        report = kwargs.pop('report', None)
+        report = report if report is not None else {}
+        task = asyncio.create_task(self.search_and_extract(
+            query, report=report, on_event=queue.put, collect=False, **kwargs
+        ))
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        
+        total = 0
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                if event['type'] == 'result':
+                    total += 1
+                yield event
+            
+            if task.exception():
+                yield {'type': 'error', 'detail': str(task.exception())}
+            else:
+                yield {
+                    'type': 'summary',
+                    'total_results': total,
+                    'scraped_at': datetime.now().isoformat(),
+                    **report
+                }
+        finally:
+            # Client went away mid-stream: stop scraping and free the session
+            if not task.done():
+                task.cancel()
+                try:
+                    await task
+                except BaseException:
+                    pass
+    
+    @tracked
+    async def batch_search_and_extract(self, searches, max_sessions=2, tabs_per_session=3,
+                                       per_host_concurrency=2, report=None):
+        """
+        Run several searches over a shared, bounded set of browser sessions
+        
+        `searches` is a list of search_and_extract keyword arguments. At most
+        `max_sessions` sessions are opened (only if something is not cached),
+        each with up to `tabs_per_session` tabs. A result URL that appears in
+        several searches is scraped once and shared, as long as they ask for
+        the same scrape options (cache and fetch mode, waits, timeouts,
+        blocking); otherwise each gets its own scrape. Returns one dict per
+        search with 'results', 'error', 'duration_ms' and its report; batch
+        stats and timing go into `report`. Shared session and page work is
+        timed on the trace of the search that started it.
+        """
+        started = time.monotonic()
+        report = report if report is not None else {}
+        logger.info("Starting batch of %d searches on %d sessions, %d tabs each",
+                    len(searches), max_sessions, tabs_per_session)
+        
+        stats = {'sessions_opened': 0, 'serp_cache_hits': 0, 'unique_urls': 0,
+                 'duplicate_urls': 0, 'page_cache_hits': 0, 'pages_scraped': 0}
+        stack = AsyncExitStack()
+        contexts = []
+        active_tabs = []
+        open_lock = asyncio.Lock()
+        tab_slots = asyncio.Semaphore(max_sessions * tabs_per_session)
+        host_limits = {}
+        page_tasks = {}
+        change_tasks = {}
+        
+        async def ensure_sessions():
+            async with open_lock:
                 if contexts:
-                    context = contexts[0]
-                    pages = context.pages
-                    page = pages[0] if pages else await context.new_page()
-                    print(f"[LOG] ✓ Using existing context")
+                    return
+                pages = await asyncio.gather(
+                    *(stack.enter_async_context(self._open_page()) for _ in range(max_sessions)),
+                    return_exceptions=True
+                )
+                for page in pages:
+                    if not isinstance(page, Exception):
+                        contexts.append(page.context)
+                        active_tabs.append(0)
+                stats['sessions_opened'] = len(contexts)
+                if not contexts:
+                    raise pages[0]
+        
+        @asynccontextmanager
+        async def tab():
+            # A fresh tab on the least busy shared session
+            await ensure_sessions()
+            async with tab_slots:
+                index = min(range(len(contexts)), key=active_tabs.__getitem__)
+                active_tabs[index] += 1
+                page = await contexts[index].new_page()
+                try:
+                    yield page
+                finally:
+                    active_tabs[index] -= 1
+                    try:
+                        await page.close()
+                    except Exception:
+                        pass
+        
+        async def scrape_page(result, options, number):
+            # Scraped at most once per batch; waiting searches share the outcome
+            if options['cache'] and options['cache_mode'] != 'bypass' and (
+                    not options['incremental'] or options['cache_mode'] == 'only'):
+                content = await options['cache'].get_page(result['url'])
+                if content is not None:
+                    stats['page_cache_hits'] += 1
+                    return content, 'hit'
+            if options['cache_mode'] == 'only':
+                return {'error': 'Not in cache'}, 'miss'
+            
+            host = urlparse(result['url']).netloc.lower()
+            host_limit = host_limits.setdefault(host, asyncio.Semaphore(per_host_concurrency))
+            try:
+                async with host_limit:
+                    content = await self.fetch_page_content(result['url'], number, options)
+                    if content is None:
+                        async with tab() as page:
+                            await options['blocker'].install(page)
+                            content = await self.extract_page_content(page, result['url'], number, options)
+            except Exception as e:
+                logger.error("Could not scrape %s: %s", result['url'], e)
+                content = {'error': str(e)}
+            stats['pages_scraped'] += 1
+            if options['cache'] and not content.get('error'):
+                await options['cache'].set_page(result['url'], content)
+            status = None
+            if options['cache']:
+                status = 'bypass' if options['cache_mode'] == 'bypass' else 'miss'
+            return content, status
+        
+        def scrape_key(url, options):
+            # Searches share a scrape only when they would have scraped the page the same way
+            return (
+                normalize_url(url), options['cache_mode'], options['fetch_mode'], options['wait_until'],
+                options['page_timeout'], options['deadline'].seconds, tuple(options['blocker'].categories),
+                options['incremental'], options['language'],
+            )
+        
+        async def track_change(result, content, options):
+            # Once per URL: a second search would find the first one's scrape already recorded
+            key = normalize_url(result['url'])
+            if key not in change_tasks:
+                change_tasks[key] = asyncio.create_task(self._track_change(result['url'], content, options))
+            return await change_tasks[key]
+        
+        async def run_search(kwargs):
+            search_started = time.monotonic()
+            query_report = {}
+            # gather runs each search in its own task, so this trace stays per search
+            trace = Trace()
+            current_trace.set(trace)
+            options = self._build_options(
+                wait_until=kwargs.get('wait_until', 'stable'),
+                page_timeout=kwargs.get('page_timeout', 30),
+                request_timeout=kwargs.get('request_timeout', 240),
+                block=kwargs.get('block'),
+                cache_mode=kwargs.get('cache_mode', 'prefer'),
+                fetch_mode=kwargs.get('fetch_mode', 'auto'),
+                report=query_report,
+                incremental=kwargs.get('incremental', False),
+                changes_only=kwargs.get('changes_only', False),
+                language=kwargs.get('language', 'it')
+            )
+            search_type = kwargs.get('search_type', 'web')
+            num_results = kwargs.get('num_results', 5)
+            search_url = self.build_google_url(
+                kwargs['query'], kwargs.get('language', 'it'), kwargs.get('region', 'it'),
+                search_type, kwargs.get('time_filter')
+            )
+            outcome = {'results': [], 'error': None, 'report': query_report}
+            try:
+                search_results = None
+                if options['cache']:
+                    search_results = await self._cached_serp(search_url, num_results, options)
+                if search_results is not None:
+                    stats['serp_cache_hits'] += 1
+                elif options['cache_mode'] == 'only':
+                    search_results = []
                 else:
-                    context = await browser.new_context()
-                    page = await context.new_page()
-                    print(f"[LOG] ✓ Created new context")
+                    async with tab() as page:
+                        await options['blocker'].install(page)
+                        search_results = await self._load_serp(page, search_url, search_type,
+                                                               num_results, options)
+                    if options['cache']:
+                        await options['cache'].set_serp(search_url, num_results, search_results)
                 
-                # Navigate to search URL
-                print(f"[LOG] Step 4: Navigating to Google search page...")
-                await page.goto(search_url, timeout=180000)  # 3 minutes
-                print(f"[LOG] ✓ Page loaded successfully")
-                await page.wait_for_timeout(2000)
+                waits = []
+                for result in search_results:
+                    key = scrape_key(result['url'], options)
+                    if key in page_tasks:
+                        stats['duplicate_urls'] += 1
+                    else:
+                        stats['unique_urls'] += 1
+                        page_tasks[key] = asyncio.create_task(
+                            scrape_page(result, options, stats['unique_urls'])
+                        )
+                    waits.append(page_tasks[key])
                 
-                # Handle cookie consent
-                print(f"[LOG] Step 5: Handling cookie consent...")
-                cookie_buttons = [
-                    'button:has-text("Accetta tutto")',
-                    'button:has-text("Accept all")',
-                    'button:has-text("Alles accepteren")',
-                    'button[id="L2AGLb"]',
+                scraped = await asyncio.gather(*waits)
+                changes = [None] * len(scraped)
+                if options['incremental']:
+                    changes = await asyncio.gather(*(
+                        track_change(result, content, options)
+                        for result, (content, _) in zip(search_results, scraped)
+                    ))
+                    for change in changes:
+                        self._count_change(options, change or 'failed')
+                outcome['results'] = [
+                    self._build_result(position, result, content, status, change)
+                    for position, (result, (content, status), change)
+                    in enumerate(zip(search_results, scraped, changes), 1)
+                    if not (options['changes_only'] and change == 'unchanged')
                 ]
+                if options['blocker'].categories:
+                    query_report['blocking'] = options['blocker'].stats()
+            except Exception as e:
+                logger.error("Batch search %r failed: %s", kwargs['query'], e)
+                outcome['error'] = str(e)
+            finally:
+                await options['blocker'].remove()
+            query_report['timings'] = trace.summary()
+            observe_search(trace, 'error' if outcome['error'] else 'success')
+            outcome['duration_ms'] = round((time.monotonic() - search_started) * 1000)
+            return outcome
+        
+        try:
+            outcomes = await asyncio.gather(*(run_search(kwargs) for kwargs in searches))
+        finally:
+            for task in [*page_tasks.values(), *change_tasks.values()]:
+                task.cancel()
+            await stack.aclose()
+        
+        report['stats'] = stats
+        report['timing'] = {
+            'duration_ms': round((time.monotonic() - started) * 1000),
+            'slowest_search_ms': max((o['duration_ms'] for o in outcomes), default=0),
+            'sum_of_searches_ms': sum(o['duration_ms'] for o in outcomes),
+        }
+        logger.info("Batch completed in %dms: %d unique URLs, %d duplicates shared, "
+                    "%d pages scraped on %d sessions",
+                    report['timing']['duration_ms'], stats['unique_urls'], stats['duplicate_urls'],
+                    stats['pages_scraped'], stats['sessions_opened'])
+        return outcomes
+    
+    @asynccontextmanager
+    async def _open_page(self):
+        """Steps 1-3 and 9-10: a page on a pooled or freshly created session"""
+        if self.pool:
+            logger.debug("Steps 1-3: Leasing warm session from pool")
+            async with AsyncExitStack() as stack:
+                with span('session_lease'):
+                    session = await stack.enter_async_context(self.pool.lease())
+                SESSIONS_ACTIVE.inc()
+                stack.callback(SESSIONS_ACTIVE.dec)
+                logger.info("Leased session %s (use #%d)", session.session_id, session.uses + 1)
                 
-                cookie_accepted = False
-                for button_selector in cookie_buttons:
+                page = await session.context.new_page()
+                try:
+                    yield page
+                finally:
                     try:
-                        await page.click(button_selector, timeout=2000)
-                        await page.wait_for_timeout(1000)
-                        print(f"[LOG] ✓ Cookie consent accepted with: {button_selector}")
-                        cookie_accepted = True
-                        break
-                    except:
-                        continue
-                
-                if not cookie_accepted:
-                    print(f"[LOG] No cookie consent button found (already accepted or not present)")
+                        await page.close()
+                    except Exception:
+                        session.discard = True
+            return
+        
+        # Create session (ids kept local: a batch opens several at once)
+        logger.debug("Step 1: Creating browser session")
+        session = await self._create_session()
+        SESSIONS_ACTIVE.inc()
+        
+        try:
+            async with AsyncExitStack() as driver:
+                # The shared driver after start(), else a short-lived one for this session
+                p = self.playwright or await driver.enter_async_context(async_playwright())
+                # Connect to Steel Browser
+                logger.debug("Step 2: Connecting to browser via CDP")
+                with span('cdp_connect'):
+                    browser = await p.chromium.connect_over_cdp(session.get('websocketUrl'))
+                logger.debug("Connected to browser")
                 
-                # Wait for results
-                print(f"[LOG] Step 6: Waiting for search results to load...")
                 try:
-                    await page.wait_for_selector('#search', timeout=180000)  # 3 minutes
-                    print(f"[LOG] ✓ Search results loaded (#search selector)")
-                except:
+                    # Get or create context and page
+                    logger.debug("Step 3: Getting browser context and page")
+                    contexts = browser.contexts
+                    if contexts:
+                        context = contexts[0]
+                        pages = context.pages
+                        page = pages[0] if pages else await context.new_page()
+                        logger.debug("Using existing context")
+                    else:
+                        context = await browser.new_context()
+                        page = await context.new_page()
+                        logger.debug("Created new context")
+                    
+                    yield page
+                finally:
+                    # Close browser
+                    logger.debug("Step 9: Closing browser")
                     try:
-                        await page.wait_for_selector('#rso', timeout=180000)  # 3 minutes
-                        print(f"[LOG] ✓ Search results loaded (#rso selector)")
-                    except:
-                        await page.wait_for_load_state('networkidle', timeout=180000)  # 3 minutes
-                        print(f"[LOG] ✓ Page reached network idle state")
-                
-                # Extract search results
-                print(f"[LOG] Step 7: Extracting search result URLs...")
-                if search_type == 'news':
-                    title_elements = await page.query_selector_all('div[role="heading"]')
-                    print(f"[LOG] Found {len(title_elements)} news title elements")
-                else:
-                    title_elements = await page.query_selector_all('h3')
-                    print(f"[LOG] Found {len(title_elements)} h3 title elements")
-                
-                search_results = []
-                for idx, title_elem in enumerate(title_elements[:num_results * 2], 1):  # Try more elements
+                        await browser.close()
+                    except Exception as e:
+                        logger.warning("Failed to close browser: %s", e)
+        finally:
+            # Release session
+            logger.debug("Step 10: Releasing session")
+            SESSIONS_ACTIVE.dec()
+            await self.release_session(session.get('id'))
+    
+    def _log_failure(self, e):
+        logger.error("Scraping failed: %s", e, exc_info=True)
+    
+    async def _search_on_page(self, page, search_url, search_type, num_results, options,
+                              search_results=None):
+        """Run the search steps with the request's resource blocking installed"""
+        blocker = options['blocker']
+        if blocker.categories:
+            logger.debug("Blocking: %s", ', '.join(blocker.categories))
+        await blocker.install(page.context)
+        try:
+            if search_results is None:
+                search_results = await self._load_serp(page, search_url, search_type, num_results, options)
+                if options['cache'] and options['cache_mode'] != 'only':
+                    await options['cache'].set_serp(search_url, num_results, search_results)
+            return await self._scrape_results(page, search_results, options)
+        finally:
+            await self._remove_blocker(options)
+    
+    async def _remove_blocker(self, options):
+        """Uninstall the request's resource blocking and report what it saved"""
+        blocker = options['blocker']
+        await blocker.remove()
+        if blocker.categories:
+            stats = blocker.stats()
+            options['report']['blocking'] = stats
+            logger.info("Blocked %d requests (~%d KB saved)",
+                        stats['requests_blocked'], stats['estimated_bytes_saved'] // 1024)
+    
+    async def _load_serp(self, page, search_url, search_type, num_results, options):
+        """
+        Steps 4-7: collect num_results result links
+        
+        The first SERP page loads in `page`; when more results are needed,
+        further pages (start= offsets) load at the same time in extra tabs.
+        Links are merged in page order and deduplicated, and pages still
+        loading are dropped once enough links are in.
+        """
+        search_results = []
+        seen = set()
+        index = 0
+        exhausted = False
+        while len(search_results) < num_results and index < MAX_SERP_PAGES and not exhausted:
+            missing = num_results - len(search_results)
+            batch = range(index, min(MAX_SERP_PAGES, index + math.ceil(missing / EXPECTED_RESULTS_PER_PAGE)))
+            index = batch[-1] + 1
+            if len(batch) > 1 or batch[0] > 0:
+                logger.debug("Loading SERP pages %d-%d in parallel", batch[0] + 1, batch[-1] + 1)
+            tasks = [
+                asyncio.create_task(self._load_serp_page(page, search_url, i, search_type, options))
+                for i in batch
+            ]
+            try:
+                for i, task in zip(batch, tasks):
                     try:
-                        title = await title_elem.inner_text()
-                        if not title or len(title.strip()) == 0:
-                            continue
-                        
-                        parent_link = await title_elem.evaluate_handle('element => element.closest("a")')
-                        if not parent_link:
-                            continue
-                        
-                        url = await parent_link.evaluate('(element) => element.href')
-                        if not url or not url.startswith('http'):
-                            continue
-                        
-                        search_results.append({
-                            'title': title.strip(),
-                            'url': url
-                        })
-                        print(f"[LOG] ✓ Extracted URL {len(search_results)}: {title[:60]}...")
-                        
-                        if len(search_results) >= num_results:
-                            break
+                        links = await task
                     except Exception as e:
-                        print(f"[LOG] Skipping element {idx}: {str(e)[:50]}")
-                        continue
-                
-                print(f"[LOG] ✓ Total URLs extracted: {len(search_results)}")
-                
-                # Deep scrape each result
-                print(f"\n[LOG] Step 8: Starting deep scrape of {len(search_results)} pages...")
-                for i, result in enumerate(search_results, 1):
-                    print(f"\n[LOG] --- Scraping page {i}/{len(search_results)} ---")
-                    print(f"[LOG] Title: {result['title'][:60]}...")
-                    print(f"[LOG] URL: {result['url']}")
-                    
-                    content = await self.extract_page_content(page, result['url'], i)
-                    
-                    # Combine search data with scraped content
-                    full_data = {
-                        'position': i,
-                        'search_title': result['title'],
-                        'url': result['url'],
-                        'page_title': content.get('title', ''),
-                        'headings': content.get('headings', []),
-                        'paragraphs': content.get('paragraphs', []),
-                        'main_text': content.get('main_text', ''),
-                        'metadata': content.get('metadata', {}),
-                        'error': content.get('error', None),
-                        'scraped_at': datetime.now().isoformat()
-                    }
-                    
-                    all_results.append(full_data)
-                    print(f"[LOG] ✓ Page {i} scraped successfully")
-                    
-                    # Small delay between requests
-                    await page.wait_for_timeout(2000)
-                
-                # Close browser
-                print(f"\n[LOG] Step 9: Closing browser...")
-                await browser.close()
-                print(f"[LOG] ✓ Browser closed")
-                
-                print(f"\n[LOG] ========== SCRAPING COMPLETED ==========")
-                print(f"[LOG] Total results scraped: {len(all_results)}")
-                
-                return all_results
-                
-            except Exception as e:
-                print(f"\n[ERROR] ========== SCRAPING FAILED ==========")
-                print(f"[ERROR] Error: {str(e)}")
-                import traceback
-                print(f"[ERROR] Traceback:\n{traceback.format_exc()}")
-                raise Exception(f"Scraping failed: {str(e)}")
+                        if i == 0:
+                            raise
+                        logger.warning("SERP page %d failed, keeping %d results: %s",
+                                       i + 1, len(search_results), e)
+                        links = []
+                    if not links:
+                        exhausted = True
+                        break
+                    for link in links:
+                        key = normalize_url(link['url'])
+                        if key not in seen:
+                            seen.add(key)
+                            search_results.append(link)
+                    if len(search_results) >= num_results:
+                        break
             finally:
-                # Release session
-                print(f"\n[LOG] Step 10: Cleanup - Releasing session...")
-                self.release_session()
+                # Enough links (or a failure): stop pages that are still loading
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+        
+        search_results = search_results[:num_results]
+        logger.info("Extracted %d result URLs from %d SERP pages", len(search_results), index)
+        return search_results
     
-    async def extract_page_content(self, page, url, position):
-        """Extract main content from a page"""
+    async def _load_serp_page(self, page, search_url, index, search_type, options):
+        """Load one SERP page (beyond the first in a new tab next to `page`) and extract its links"""
+        deadline = options['deadline']
+        url = serp_page_url(search_url, index)
+        tab = page
+        if index > 0:
+            tab = await page.context.new_page()
+            if not options['blocker'].routes(page.context):
+                await options['blocker'].install(tab)
         try:
-            print(f"  [LOG] Navigating to page {position}...")
-            await page.goto(url, wait_until='domcontentloaded', timeout=180000)  # 3 minutes
-            print(f"  [LOG] ✓ Page {position} loaded")
-            await page.wait_for_timeout(3000)
+            # Navigate to search URL
+            logger.debug("Step 4: Navigating to Google search page %d", index + 1)
+            await self.consent.prepare(tab.context, url)
+            with span('serp_load', page=index + 1):
+                await tab.goto(url, timeout=deadline.timeout_ms())
             
-            content = {
-                'url': url,
-                'title': '',
-                'main_text': '',
-                'headings': [],
-                'paragraphs': [],
-                'metadata': {}
-            }
-            
-            # Get page title
-            print(f"  [LOG] Extracting page title...")
-            try:
-                content['title'] = await page.title()
-                print(f"  [LOG] ✓ Title: {content['title'][:50]}...")
-            except Exception as e:
-                print(f"  [LOG] ⚠ Could not extract title: {str(e)[:30]}")
-                pass
-            
-            # Find main content
-            print(f"  [LOG] Finding main content container...")
-            main_selectors = [
-                'article',
-                'main',
-                '[role="main"]',
-                '.article-content',
-                '.post-content',
-                '.content',
-                '#content',
-                '.article-body',
-                '.entry-content'
-            ]
+            # Handle cookie consent
+            logger.debug("Step 5: Handling cookie consent")
+            with span('consent', page=index + 1) as entry:
+                entry.update(await self.consent.handle(tab, url))
             
-            main_content = None
-            for selector in main_selectors:
+            # Wait for results
+            logger.debug("Step 6: Waiting for search results to load")
+            with span('serp_wait', page=index + 1):
                 try:
-                    main_content = await page.query_selector(selector)
-                    if main_content:
-                        print(f"  [LOG] ✓ Found main content with selector: {selector}")
-                        break
-                except:
-                    continue
-            
-            if not main_content:
-                main_content = await page.query_selector('body')
-                print(f"  [LOG] Using body as main content")
+                    await tab.wait_for_selector('#search, #rso', timeout=min(deadline.timeout_ms(), 30000))
+                except DeadlineExceeded:
+                    raise
+                except Exception:
+                    # Not CancelledError: tabs dropped by an early stop or a disconnect must stop here
+                    await tab.wait_for_load_state('networkidle', timeout=deadline.timeout_ms())
+                    logger.debug("No #search/#rso selector, page reached network idle state")
             
-            if main_content:
-                # Extract headings
-                print(f"  [LOG] Extracting headings...")
-                h_elements = await main_content.query_selector_all('h1, h2, h3, h4')
-                for h in h_elements[:30]:
-                    try:
-                        heading_text = await h.inner_text()
-                        if heading_text and len(heading_text.strip()) > 0:
-                            content['headings'].append(heading_text.strip())
-                    except:
-                        pass
-                print(f"  [LOG] ✓ Found {len(content['headings'])} headings")
-                
-                # Extract paragraphs
-                print(f"  [LOG] Extracting paragraphs...")
-                p_elements = await main_content.query_selector_all('p')
-                for p in p_elements[:50]:
-                    try:
-                        p_text = await p.inner_text()
-                        if p_text and len(p_text.strip()) > 20:
-                            content['paragraphs'].append(p_text.strip())
-                    except:
-                        pass
-                print(f"  [LOG] ✓ Found {len(content['paragraphs'])} paragraphs")
-                
-                # Get all text
-                print(f"  [LOG] Extracting full text...")
+            # Extract search results, all links in one round-trip
+            logger.debug("Step 7: Extracting search result URLs")
+            with span('link_extraction', page=index + 1) as entry:
+                links = await extract_serp_links(tab, search_type)
+                entry['links'] = len(links)
+            return links
+        finally:
+            if tab is not page:
+                await options['blocker'].remove(tab)
                 try:
-                    main_text = await main_content.inner_text()
-                    content['main_text'] = main_text[:20000]  # Limit to 20k chars
-                    print(f"  [LOG] ✓ Extracted {len(main_text)} characters (stored: {len(content['main_text'])})")
-                except Exception as e:
-                    print(f"  [LOG] ⚠ Could not extract text: {str(e)[:30]}")
+                    await tab.close()
+                except Exception:
                     pass
+    
+    async def _scrape_results(self, page, search_results, options, open_page=None):
+        """
+        Step 8: deep scrape each result, serving cached pages where allowed
+        
+        Without a `page`, `open_page` is awaited for one the first time a
+        result needs the browser.
+        """
+        await self._emit(options, {
+            'type': 'serp',
+            'results': [
+                {'position': position, 'title': result['title'], 'url': result['url']}
+                for position, result in enumerate(search_results, 1)
+            ]
+        })
+        cached_pages = await self._lookup_cached_pages(search_results, options)
+        cache_mode = options['cache_mode']
+        collected = {}
+        page_hits = 0
+        browser = {'page': page, 'error': None}
+        browser_lock = asyncio.Lock()
+        
+        async def get_page():
+            # Opened once and shared by every tab; a failed open is not retried per page
+            async with browser_lock:
+                if browser['page'] is None and browser['error'] is None:
+                    try:
+                        browser['page'] = await open_page()
+                    except Exception as e:
+                        browser['error'] = e
+            if browser['error'] is not None:
+                raise browser['error']
+            return browser['page']
+        
+        async def finish(position, result, content, cache_status):
+            # Store, build and hand off each result as soon as it is ready
+            if cache_status in ('miss', 'bypass') and not content.get('error'):
+                await options['cache'].set_page(result['url'], content)
+            change = None
+            if options['incremental']:
+                change = await self._track_change(result['url'], content, options)
+                self._count_change(options, change or 'failed')
+                if change == 'unchanged' and options['changes_only']:
+                    await self._emit(options, {'type': 'unchanged', 'position': position, 'url': result['url']})
+                    return
+            record = self._build_result(position, result, content, cache_status, change)
+            if options['collect']:
+                collected[position] = record
+            await self._emit(options, {'type': 'result', 'result': record})
+        
+        pending = []
+        for position, result in enumerate(search_results, 1):
+            if result['url'] in cached_pages:
+                page_hits += 1
+                await finish(position, result, cached_pages[result['url']], 'hit')
+            elif cache_mode == 'only':
+                await finish(position, result, {'error': 'Not in cache'}, 'miss')
+            else:
+                pending.append((position, result))
+        
+        if pending:
+            status = None
+            if options['cache']:
+                status = 'bypass' if cache_mode == 'bypass' else 'miss'
             
-            # Extract metadata
-            print(f"  [LOG] Extracting metadata...")
+            concurrency = options['concurrency']
+            per_host_concurrency = options['per_host_concurrency']
+            if concurrency > 1 and len(pending) > 1:
+                logger.info("Step 8: Concurrent deep scrape of %d pages (max %d tabs, %d per host)",
+                            len(pending), concurrency, per_host_concurrency)
+                
+                async def on_scraped(position, result, content):
+                    await finish(position, result, content, status)
+                
+                await self._scrape_concurrently(get_page, pending, len(search_results), options, on_scraped)
+            else:
+                logger.info("Step 8: Deep scrape of %d pages", len(pending))
+                for position, result in pending:
+                    logger.debug("Scraping page %d/%d: %s", position, len(search_results), result['url'])
+                    content = await self.fetch_page_content(result['url'], position, options)
+                    if content is None:
+                        content = await self.extract_page_content(await get_page(), result['url'],
+                                                                  position, options)
+                    await finish(position, result, content, status)
+        
+        if options['cache']:
+            options['report']['cache'] = {
+                'mode': cache_mode,
+                'serp': options['report'].get('cache', {}).get('serp', cache_mode),
+                'page_hits': page_hits,
+                'page_misses': len(search_results) - page_hits,
+            }
+        
+        logger.info("Scraping completed: %d results", len(search_results))
+        
+        return [collected[position] for position in sorted(collected)]
+    
+    async def _emit(self, options, event):
+        if options['emit']:
+            await options['emit'](event)
+    
+    async def _cached_serp(self, search_url, num_results, options):
+        """Search results from the SERP tier, or None on a miss or bypass"""
+        if options['cache_mode'] == 'bypass':
+            return None
+        search_results = await options['cache'].get_serp(search_url, num_results)
+        options['report']['cache'] = {'serp': 'hit' if search_results is not None else 'miss'}
+        if search_results is not None:
+            logger.info("SERP cache hit (%d results)", len(search_results))
+        return search_results
+    
+    async def _lookup_cached_pages(self, search_results, options):
+        """Cached page content by result URL (memoized for the request)"""
+        if 'cached_pages' in options:
+            return options['cached_pages']
+        cached_pages = {}
+        # Incremental searches re-check every page unless told to stay offline
+        if options['cache'] and options['cache_mode'] != 'bypass' and (
+                not options['incremental'] or options['cache_mode'] == 'only'):
+            for result in search_results:
+                content = await options['cache'].get_page(result['url'])
+                if content is not None:
+                    cached_pages[result['url']] = content
+        if cached_pages:
+            logger.info("Page cache hits: %d/%d", len(cached_pages), len(search_results))
+        options['cached_pages'] = cached_pages
+        return cached_pages
+    
+    async def _seen(self, url, options):
+        """Last incremental scrape of `url` (memoized for the request), or None"""
+        seen = options.setdefault('seen', {})
+        if url not in seen:
+            seen[url] = await options['cache'].get_seen(url)
+        return seen[url]
+    
+    async def _track_change(self, url, content, options):
+        """'new', 'changed' or 'unchanged' against the last scrape of `url`, which this one replaces"""
+        if content.get('error'):
+            return None
+        seen = await self._seen(url, options)
+        if seen is None:
+            change = 'new'
+        elif seen['hash'] == content_hash(content.get('main_text', '')):
+            change = 'unchanged'
+        else:
+            change = 'changed'
+        await options['cache'].set_seen(url, content)
+        PAGE_CHANGES.inc(change=change)
+        return change
+    
+    def _count_change(self, options, key):
+        """Tally incremental outcomes in report['changes']"""
+        changes = options['report'].setdefault('changes', {
+            'new': 0, 'changed': 0, 'unchanged': 0, 'failed': 0, 'not_modified': 0
+        })
+        changes[key] += 1
+    
+    async def _scrape_concurrently(self, get_page, pending, total, options, on_scraped):
+        """Scrape result pages in separate tabs of `await get_page()`, bounded globally and per host"""
+        global_limit = asyncio.Semaphore(options['concurrency'])
+        per_host_concurrency = options['per_host_concurrency']
+        host_limits = {}
+        
+        async def scrape(position, result):
+            host = urlparse(result['url']).netloc.lower()
+            host_limit = host_limits.setdefault(host, asyncio.Semaphore(per_host_concurrency))
+            # Take the host slot first so a busy host doesn't hold global slots;
+            # the HTTP fast path needs no tab, so it runs outside the global limit
+            async with host_limit:
+                content = await self.fetch_page_content(result['url'], position, options)
+                if content is None:
+                    async with global_limit:
+                        content = await self._scrape_in_new_tab(get_page, result['url'], position, total, options)
+            await on_scraped(position, result, content)
+        
+        await asyncio.gather(*(scrape(position, result) for position, result in pending))
+    
+    async def _scrape_in_new_tab(self, get_page, url, position, total, options):
+        logger.debug("Scraping page %d/%d in new tab: %s", position, total, url)
+        try:
+            tab = await (await get_page()).context.new_page()
+        except Exception as e:
+            logger.error("Could not open tab for page %d: %s", position, e)
+            return {'error': str(e), 'fetched_via': 'browser'}
+        try:
+            return await self.extract_page_content(tab, url, position, options)
+        finally:
             try:
-                meta_desc = await page.query_selector('meta[name="description"]')
-                if meta_desc:
-                    content['metadata']['description'] = await meta_desc.get_attribute('content')
-                    print(f"  [LOG] ✓ Found meta description")
-            except:
+                await tab.close()
+            except Exception:
                 pass
+    
+    def _build_result(self, position, result, content, cache=None, change=None):
+        """Combine search data with scraped content"""
+        return {
+            'position': position,
+            'search_title': result['title'],
+            'url': result['url'],
+            'page_title': content.get('title', ''),
+            'headings': content.get('headings', []),
+            'paragraphs': content.get('paragraphs', []),
+            'main_text': content.get('main_text', ''),
+            'metadata': content.get('metadata', {}),
+            'error': content.get('error', None),
+            'fetched_via': content.get('fetched_via'),
+            'cache': cache,
+            'change': change,
+            'scraped_at': datetime.now().isoformat()
+        }
+    
+    async def extract_page_content(self, page, url, position, options=None):
+        """Extract main content from a page"""
+        options = options or {}
+        request_deadline = options.get('deadline') or Deadline(name='request')
+        deadline = request_deadline.child(options.get('page_timeout'))
+        started = time.monotonic()
+        try:
+            await self.consent.prepare(page.context, url)
+            with span('page_navigate', position=position, url=url) as entry:
+                ready = await navigate(page, url, options.get('wait_until', 'stable'), deadline)
+                entry['stable'] = ready['stable']
+            
+            with span('consent', position=position, url=url) as entry:
+                entry.update(await self.consent.handle(page, url, CONSENT_PAGE_WAIT_MS))
             
-            print(f"  [LOG] ✓ Content extraction complete for page {position}")
+            # Title, headings, paragraphs, text and metadata in one round-trip
+            with span('page_extract', position=position, url=url):
+                data = await asyncio.wait_for(extract_from_page(page), timeout=deadline.remaining())
+            content = self._page_content(url, data, 'browser')
+            self._count_fetch(options, 'browser')
+            logger.info(
+                "Page %d scraped in %dms: %d headings, %d paragraphs, %d chars from %s",
+                position, ready['elapsed_ms'], len(content['headings']), len(content['paragraphs']),
+                data.get('main_text_length', 0), data.get('container'),
+                extra={'fields': {'url': url, 'position': position, 'wait': ready['strategy']}}
+            )
+            observe_page(url, 'success', time.monotonic() - started, content['main_text'], via='browser')
             return content
             
         except Exception as e:
-            print(f"  [ERROR] Failed to extract content from page {position}: {str(e)}")
-            import traceback
-            print(f"  [ERROR] Traceback: {traceback.format_exc()[:200]}")
-            return {
-                'url': url,
-                'error': str(e),
-                'title': '',
-                'main_text': '',
-                'headings': [],
-                'paragraphs': []
-            }
+            error = str(e)
+            timed_out = deadline.expired() or isinstance(e, (DeadlineExceeded, asyncio.TimeoutError))
+            if timed_out:
+                error = f"Timed out: {deadline.describe()}"
+            observe_page(url, 'timeout' if timed_out else 'error', time.monotonic() - started, via='browser')
+            self._count_fetch(options, 'browser')
+            logger.warning("Failed to extract content from page %d: %s", position, error,
+                           extra={'fields': {'url': url, 'position': position}})
+            return self._error_content(url, error, 'browser')
+    
+    async def fetch_page_content(self, url, position, options=None):
+        """
+        HTTP fast path: extract a server-rendered page without a browser
+        
+        Returns None when the page should go to the browser instead (see
+        http_fetcher.fallback_reason), or always with fetch_mode 'browser'.
+        With fetch_mode 'http' such pages come back with `error` set, and so
+        do pages reached after the deadline ran out, without being fetched.
+        
+        In incremental mode the GET is conditional on the validators of the
+        last scrape; a 304 returns that scrape's content without parsing.
+        """
+        options = options or {}
+        mode = options.get('fetch_mode', 'browser')
+        if mode == 'browser':
+            return None
+        request_deadline = options.get('deadline') or Deadline(name='request')
+        deadline = request_deadline.child(options.get('page_timeout'))
+        if deadline.expired():
+            # Out of request budget: don't spend a fetch (or a tab) on this page
+            self._count_fetch(options, 'fallback', 'timeout')
+            observe_page(url, 'timeout', 0, via='http')
+            return self._error_content(url, f"Timed out: {deadline.describe()}", 'http')
+        started = time.monotonic()
+        data = None
+        seen = await self._seen(url, options) if options.get('incremental') else None
+        # Only pages fetched over HTTP carry validators: a browser render may change without its HTML
+        validators = self._validators(seen['content']) if seen else {}
+        try:
+            with span('http_fetch', position=position, url=url) as entry:
+                response = await self.fetcher.fetch(url, timeout=deadline.remaining(),
+                                                    language=options.get('language'), **validators)
+                entry['status'] = response['status']
+            if response['status'] == 304 and validators:
+                content = {**seen['content'], **self._validators(response)}
+                self._count_fetch(options, 'http')
+                self._count_change(options, 'not_modified')
+                logger.info("Page %d not modified since the last scrape", position,
+                            extra={'fields': {'url': url, 'position': position}})
+                observe_page(url, 'success', time.monotonic() - started, via='http')
+                return content
+            if response['html']:
+                # Parsing a large page takes a few ms: keep it off the event loop
+                with span('html_extract', position=position, url=url):
+                    data = await asyncio.to_thread(extract_from_html, response['html'], response['url'])
+            reason = fallback_reason(response, data)
+        except Exception as e:
+            reason = 'timeout' if isinstance(e, httpx.TimeoutException) else 'fetch_error'
+            logger.debug("HTTP fetch of page %d failed: %s", position, e)
+        
+        if reason:
+            self._count_fetch(options, 'fallback', reason)
+            if mode == 'http':
+                observe_page(url, 'timeout' if reason == 'timeout' else 'error',
+                             time.monotonic() - started, via='http')
+                return self._error_content(url, f"Page needs a browser ({reason})", 'http')
+            logger.info("Page %d needs the browser (%s)", position, reason,
+                        extra={'fields': {'url': url, 'position': position}})
+            return None
+        
+        content = {**self._page_content(url, data, 'http'), **self._validators(response)}
+        self._count_fetch(options, 'http')
+        logger.info(
+            "Page %d fetched over HTTP in %dms: %d headings, %d paragraphs, %d chars from %s",
+            position, (time.monotonic() - started) * 1000, len(content['headings']),
+            len(content['paragraphs']), data['main_text_length'], data['container'],
+            extra={'fields': {'url': url, 'position': position}}
+        )
+        observe_page(url, 'success', time.monotonic() - started, content['main_text'], via='http')
+        return content
+    
+    def _page_content(self, url, data, fetched_via):
+        return {
+            'url': url,
+            'title': data.get('title', ''),
+            'main_text': data.get('main_text', ''),
+            'headings': data.get('headings', []),
+            'paragraphs': data.get('paragraphs', []),
+            'metadata': data.get('metadata', {}),
+            'fetched_via': fetched_via
+        }
+    
+    def _validators(self, data):
+        """ETag and Last-Modified of an HTTP response (or of content fetched with one)"""
+        return {key: data[key] for key in ('etag', 'last_modified') if data.get(key)}
+    
+    def _error_content(self, url, error, fetched_via):
+        return {
+            'url': url,
+            'error': error,
+            'title': '',
+            'main_text': '',
+            'headings': [],
+            'paragraphs': [],
+            'fetched_via': fetched_via
+        }
+    
+    def _count_fetch(self, options, path, reason=None):
+        """Tally pages per fetch path (and fallback reasons) in report['fetch']"""
+        report = options.get('report')
+        if report is None:
+            return
+        fetch = report.setdefault('fetch', {'mode': options.get('fetch_mode', 'browser'),
+                                            'http': 0, 'browser': 0, 'fallbacks': {}})
+        if reason:
+            fetch['fallbacks'][reason] = fetch['fallbacks'].get(reason, 0) + 1
+        else:
+            fetch[path] += 1
 
@@ -0,0 +1,125 @@
+"""
+Tracing Module
+Structured logging with request ids and per-stage timing spans
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+
+request_id_var = contextvars.ContextVar('request_id', default=None)
+current_trace = contextvars.ContextVar('current_trace', default=None)
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps every record with the request id of the running task"""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class LocalQueueHandler(logging.handlers.QueueHandler):
+    """Queue records as-is; message formatting happens on the listener thread"""
+
+    def prepare(self, record):
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra={'fields': {...}}` adds structured fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', None),
+            'message': record.getMessage(),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(level='INFO', fmt='json'):
+    """
+    Route all logging through a queue so formatting and stdout writes
+    happen on a background thread instead of the event loop.
+    """
+    handler = logging.StreamHandler(sys.stdout)
+    if fmt == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(
+            '%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s'
+        ))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = LocalQueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+    listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level.upper())
+    return listener
+
+
+class Trace:
+    """Spans recorded for one request, relative to when it started"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.spans = []
+
+    @contextmanager
+    def span(self, name, **attrs):
+        start = time.monotonic()
+        entry = {'name': name, 'start_ms': round((start - self.started) * 1000, 1), **attrs}
+        try:
+            yield entry
+        except BaseException as e:
+            entry['error'] = type(e).__name__
+            raise
+        finally:
+            entry['duration_ms'] = round((time.monotonic() - start) * 1000, 1)
+            self.spans.append(entry)
+
+    def summary(self):
+        """Total time, per-stage aggregates and the individual spans"""
+        stages = {}
+        for entry in self.spans:
+            stage = stages.setdefault(entry['name'], {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            stage['count'] += 1
+            stage['total_ms'] = round(stage['total_ms'] + entry['duration_ms'], 1)
+            stage['max_ms'] = max(stage['max_ms'], entry['duration_ms'])
+        return {
+            'total_ms': round((time.monotonic() - self.started) * 1000, 1),
+            'stages': stages,
+            'spans': sorted(self.spans, key=lambda s: s['start_ms']),
+        }
+
+
+@contextmanager
+def span(name, **attrs):
+    """Record a span on the current request's trace (no-op outside a trace)"""
+    trace = current_trace.get()
+    if trace is None:
+        yield {}
+        return
+    with trace.span(name, **attrs) as entry:
+        yield entry
@@ -0,0 +1,126 @@
+"""
+Wait Strategy Module
+Readiness-based page waiting with per-page and per-request deadlines
+"""
+
+import time
+
+
+# domcontentloaded / load / networkidle map to Playwright load states;
+# stable waits for DOMContentLoaded and then for the text length to settle
+WAIT_STRATEGIES = ['domcontentloaded', 'load', 'networkidle', 'stable']
+
+STABLE_QUIET_MS = 500
+STABLE_POLL_MS = 200
+STABLE_MAX_MS = 5000
+
+# Resolves once document.body.innerText stops changing for quietMs (or maxMs passes)
+STABILITY_SCRIPT = """
+({quietMs, maxMs, pollMs}) => new Promise((resolve) => {
+    const start = performance.now();
+    let last = -1;
+    let stableSince = start;
+    const tick = () => {
+        const length = document.body ? document.body.innerText.length : 0;
+        const now = performance.now();
+        if (length !== last) {
+            last = length;
+            stableSince = now;
+        }
+        if (length > 0 && now - stableSince >= quietMs) {
+            return resolve({stable: true, length: length});
+        }
+        if (now - start >= maxMs) {
+            return resolve({stable: false, length: length});
+        }
+        setTimeout(tick, pollMs);
+    };
+    tick();
+})
+"""
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Deadline:
+    """Wall-clock budget; `None` seconds means no limit"""
+
+    def __init__(self, seconds=None, parent=None, name='page'):
+        self.seconds = seconds
+        self.name = name
+        self.expires_at = time.monotonic() + seconds if seconds else None
+        self.parent = parent
+
+    def remaining(self):
+        """Seconds left on this deadline or any parent, None if unbounded"""
+        candidates = []
+        if self.expires_at is not None:
+            candidates.append(self.expires_at - time.monotonic())
+        if self.parent is not None:
+            parent_remaining = self.parent.remaining()
+            if parent_remaining is not None:
+                candidates.append(parent_remaining)
+        if not candidates:
+            return None
+        return max(0.0, min(candidates))
+
+    def expired(self):
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def timeout_ms(self, cap_ms=180000):
+        """Remaining budget as a Playwright timeout, raising once it is spent"""
+        remaining = self.remaining()
+        if remaining is None:
+            return cap_ms
+        if remaining <= 0:
+            raise DeadlineExceeded(self.describe())
+        return max(1, min(cap_ms, int(remaining * 1000)))
+
+    def child(self, seconds, name='page'):
+        """A sub-budget that also respects this deadline"""
+        return Deadline(seconds, parent=self, name=name)
+
+    def describe(self):
+        if self.parent is not None and self.parent.expired():
+            return self.parent.describe()
+        if self.seconds:
+            return f"{self.name} deadline of {self.seconds:g}s exceeded"
+        return f"{self.name} deadline exceeded"
+
+
+async def navigate(page, url, strategy='stable', deadline=None):
+    """
+    Navigate and wait until the page is ready according to `strategy`.
+
+    The stability wait is capped at STABLE_MAX_MS: pages whose text keeps
+    changing (tickers, live blogs) are extracted as they are at that point.
+
+    Returns a dict describing how readiness was reached. Raises
+    DeadlineExceeded (or Playwright's TimeoutError) if the budget runs out.
+    """
+    deadline = deadline or Deadline()
+    started = time.monotonic()
+
+    load_state = 'domcontentloaded' if strategy == 'stable' else strategy
+    await page.goto(url, wait_until=load_state, timeout=deadline.timeout_ms())
+    ready = {'strategy': strategy, 'stable': None}
+
+    if strategy == 'stable':
+        try:
+            result = await page.evaluate(STABILITY_SCRIPT, {
+                'quietMs': STABLE_QUIET_MS,
+                'maxMs': deadline.timeout_ms(cap_ms=STABLE_MAX_MS),
+                'pollMs': STABLE_POLL_MS,
+            })
+            ready['stable'] = result.get('stable')
+        except DeadlineExceeded:
+            raise
+        except Exception:
+            # Client-side redirect destroyed the context; the new document is loaded
+            ready['stable'] = False
+
+    ready['elapsed_ms'] = round((time.monotonic() - started) * 1000)
+    return ready